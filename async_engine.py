@@ -0,0 +1,474 @@
+from runtime import RunTimeResult
+from datatype import *
+from errors import RunTimeError, IterationError
+from context import Context, Environment
+from interpreter import Interpreter, BaseFunction, Function, BuiltInFunction, parse, global_symbol_table
+from engine import RunResult
+from quota import Quota
+from metrics import RunStats
+from output import OutputSink
+import metrics
+import asyncio
+import inspect
+import io
+import sys
+import time
+
+def is_binary(stream):
+  # asyncio.StreamWriter and binary files take bytes, not text.
+  return isinstance(stream, (asyncio.StreamWriter, io.RawIOBase, io.BufferedIOBase))
+
+def text_target(stream):
+  # An OutputSink target for stream: text streams as they are, byte
+  # streams wrapped to take text encoded as UTF-8.
+  if is_binary(stream):
+    return lambda text: stream.write(text.encode('utf-8'))
+  return stream
+
+class AsyncInterpreter(Interpreter):
+  # Reuses the synchronous dispatch: leaf nodes run the inherited visit_*
+  # methods, every node that evaluates children is overridden with a
+  # coroutine so calls, I/O builtins and loop back-edges can suspend.
+  def __init__(self, stdin=None, stdout=None, yield_interval=100):
+    self.stdin = stdin
+    self.stdout = stdout if stdout is not None else sys.stdout
+    self.yield_interval = yield_interval
+    self.back_edges = 0
+
+  async def visit(self, node, context):
+    result = Interpreter.visit(self, node, context)
+    if inspect.isawaitable(result):
+      result = await result
+    return result
+
+  async def back_edge(self, node, context):
+    self.back_edges += 1
+    if self.back_edges >= self.yield_interval:
+      self.back_edges = 0
+      await asyncio.sleep(0)
+    return self.check_step(node, context) if context.quota else None
+
+  ###################################
+
+  async def visit_ListNode(self, node, context):
+    res = RunTimeResult()
+    elements = []
+
+    for element_node in node.element_nodes:
+      elements.append(res.register(await self.visit(element_node, context)))
+      if res.should_return(): return res
+
+    return res.success(
+      List(elements).set_context(context).set_position(node.start, node.end)
+    )
+
+  async def visit_MapNode(self, node, context):
+    res = RunTimeResult()
+    map_ = Map({}).set_context(context).set_position(node.start, node.end)
+
+    for key_node, value_node in node.pair_nodes:
+      key = res.register(await self.visit(key_node, context))
+      if res.should_return(): return res
+      value = res.register(await self.visit(value_node, context))
+      if res.should_return(): return res
+
+      _, error = map_.set(key, value)
+      if error: return res.failure(error)
+
+    return res.success(map_)
+
+  async def visit_VarAssignNode(self, node, context):
+    res = RunTimeResult()
+    var_name = node.var_name_tkn.value
+    value = res.register(await self.visit(node.value_node, context))
+    if res.should_return(): return res
+
+    context.symbol_table.set(var_name, value)
+    return res.success(value)
+
+  async def visit_BinOpNode(self, node, context):
+    res = RunTimeResult()
+    left = res.register(await self.visit(node.left_node, context))
+    if res.should_return(): return res
+    right = res.register(await self.visit(node.right_node, context))
+    if res.should_return(): return res
+
+    if context.quota:
+      error = self.check_allocation(node, left, right, context)
+      if error: return res.failure(error)
+    return self.binary_operation(node, left, right)
+
+  async def visit_UnaryOpNode(self, node, context):
+    res = RunTimeResult()
+    number = res.register(await self.visit(node.node, context))
+    if res.should_return(): return res
+    return self.unary_operation(node, number)
+
+  async def visit_FieldAccessNode(self, node, context):
+    res = RunTimeResult()
+    record = res.register(await self.visit(node.node, context))
+    if res.should_return(): return res
+    return self.field_access(node, record, context)
+
+  async def visit_IfNode(self, node, context):
+    res = RunTimeResult()
+
+    for condition, expr, should_return_null in node.cases:
+      condition_value = res.register(await self.visit(condition, context))
+      if res.should_return(): return res
+
+      if condition_value.is_true():
+        expr_value = res.register(await self.visit(expr, context))
+        if res.should_return(): return res
+        return res.success(Number.null if should_return_null else expr_value)
+
+    if node.else_case:
+      expr, should_return_null = node.else_case
+      expr_value = res.register(await self.visit(expr, context))
+      if res.should_return(): return res
+      return res.success(Number.null if should_return_null else expr_value)
+
+    return res.success(Number.null)
+
+  async def visit_ForNode(self, node, context):
+    res = RunTimeResult()
+    elements = []
+
+    start_value = res.register(await self.visit(node.start_value_node, context))
+    if res.should_return(): return res
+
+    end_value = res.register(await self.visit(node.end_value_node, context))
+    if res.should_return(): return res
+
+    if node.step_value_node:
+      step_value = res.register(await self.visit(node.step_value_node, context))
+      if res.should_return(): return res
+    else:
+      step_value = Number(1)
+
+    i = start_value.value
+
+    if step_value.value >= 0:
+      condition = lambda: i < end_value.value
+    else:
+      condition = lambda: i > end_value.value
+
+    while condition():
+      context.symbol_table.set(node.var_name_tkn.value, Number(i))
+      i += step_value.value
+
+      value = res.register(await self.visit(node.body_node, context))
+      if res.should_return() and res.loop_continue == False and res.loop_break == False: return res
+
+      if context.stats: context.stats.iterations += 1
+      error = await self.back_edge(node, context)
+      if error: return res.failure(error)
+
+      if res.loop_continue:
+        continue
+
+      if res.loop_break:
+        break
+
+      elements.append(value)
+
+    return res.success(
+      Number.null if node.should_return_null else
+      List(elements).set_context(context).set_position(node.start, node.end)
+    )
+
+  async def visit_ForInNode(self, node, context):
+    res = RunTimeResult()
+    elements = []
+
+    iterable = res.register(await self.visit(node.iterable_node, context))
+    if res.should_return(): return res
+
+    iterator = iterable.iterate()
+    if iterator == None:
+      return res.failure(RunTimeError(
+        node.iterable_node.start, node.iterable_node.end,
+        "Value is not iterable",
+        context
+      ))
+
+    try:
+      for element in iterator:
+        context.symbol_table.set(node.var_name_tkn.value, element)
+
+        value = res.register(await self.visit(node.body_node, context))
+        if res.should_return() and res.loop_continue == False and res.loop_break == False: return res
+
+        if context.stats: context.stats.iterations += 1
+        error = await self.back_edge(node, context)
+        if error: return res.failure(error)
+
+        if res.loop_continue:
+          continue
+
+        if res.loop_break:
+          break
+
+        elements.append(value)
+    except IterationError as e:
+      return res.failure(e.error)
+
+    return res.success(
+      Number.null if node.should_return_null else
+      List(elements).set_context(context).set_position(node.start, node.end)
+    )
+
+  async def visit_WhileNode(self, node, context):
+    res = RunTimeResult()
+    elements = []
+
+    while True:
+      condition = res.register(await self.visit(node.condition_node, context))
+      if res.should_return(): return res
+
+      if not condition.is_true():
+        break
+
+      value = res.register(await self.visit(node.body_node, context))
+      if res.should_return() and res.loop_continue == False and res.loop_break == False: return res
+
+      if context.stats: context.stats.iterations += 1
+      error = await self.back_edge(node, context)
+      if error: return res.failure(error)
+
+      if res.loop_continue:
+        continue
+
+      if res.loop_break:
+        break
+
+      elements.append(value)
+
+    return res.success(
+      Number.null if node.should_return_null else
+      List(elements).set_context(context).set_position(node.start, node.end)
+    )
+
+  async def visit_CallNode(self, node, context):
+    res = RunTimeResult()
+    args = []
+
+    value_to_call = res.register(await self.visit(node.node_to_call, context))
+    if res.should_return(): return res
+    value_to_call = value_to_call.copy().set_position(node.start, node.end)
+
+    for arg_node in node.arg_nodes:
+      args.append(res.register(await self.visit(arg_node, context)))
+      if res.should_return(): return res
+
+    return_value = res.register(await self.call(value_to_call, args))
+    if res.should_return(): return res
+    return_value = return_value.copy().set_position(node.start, node.end).set_context(context)
+    return res.success(return_value)
+
+  async def visit_ReturnNode(self, node, context):
+    res = RunTimeResult()
+
+    if node.node_to_return:
+      value = res.register(await self.visit(node.node_to_return, context))
+      if res.should_return(): return res
+    else:
+      value = Number.null
+
+    return res.success_return(value)
+
+  ###################################
+
+  async def call(self, value_to_call, args):
+    if isinstance(value_to_call, Function):
+      return await self.execute_function(value_to_call, args)
+
+    if isinstance(value_to_call, BuiltInFunction):
+      handler = getattr(self, f'builtin_{value_to_call.name}', None)
+      if handler:
+        return await self.execute_builtin(value_to_call, handler, args)
+
+    return value_to_call.execute(args)
+
+  async def execute_function(self, function, args):
+    if function.is_generator:
+      return function.execute(args)
+
+    res = RunTimeResult()
+    exec_ctx = function.generate_new_context()
+    if exec_ctx.stats: exec_ctx.stats.call(exec_ctx.depth)
+
+    if exec_ctx.quota:
+      message = exec_ctx.quota.enter(exec_ctx.depth)
+      if message: return res.failure(RunTimeError(function.start, function.end, message, exec_ctx))
+
+    res.register(function.check_and_populate_args(function.arg_names, args, exec_ctx))
+    if res.should_return(): return res
+
+    await self.back_edge(function.body_node, exec_ctx)
+    value = res.register(await self.visit(function.body_node, exec_ctx))
+    if res.should_return() and res.func_return_value == None: return res
+
+    ret_value = (value if function.should_auto_return else None) or res.func_return_value or Number.null
+    return res.success(ret_value)
+
+  async def execute_builtin(self, builtin, handler, args):
+    res = RunTimeResult()
+    exec_ctx = builtin.generate_new_context()
+    if exec_ctx.stats: exec_ctx.stats.call(exec_ctx.depth)
+    arg_names = getattr(builtin, f'execute_{builtin.name}').arg_names
+
+    res.register(builtin.check_and_populate_args(arg_names, args, exec_ctx))
+    if res.should_return(): return res
+
+    return_value = res.register(await handler(builtin, exec_ctx))
+    if res.should_return(): return res
+    return res.success(return_value)
+
+  async def write(self, text, exec_ctx):
+    # Goes through the run's OutputSink like the synchronous print; a
+    # stream target (e.g. asyncio.StreamWriter) is drained afterwards so a
+    # slow reader holds back only the script that is printing.
+    if exec_ctx.output: exec_ctx.output.write(text)
+    else: self.stdout.write(text.encode('utf-8') if is_binary(self.stdout) else text)
+    await self.drain()
+
+  async def flush(self, exec_ctx):
+    if exec_ctx.output: exec_ctx.output.flush()
+    await self.drain()
+
+  async def drain(self):
+    drain = getattr(self.stdout, 'drain', None)
+    if drain: await drain()
+
+  async def read_line(self, exec_ctx):
+    await self.flush(exec_ctx)
+    if self.stdin is None:
+      line = await asyncio.get_running_loop().run_in_executor(None, sys.stdin.readline)
+    else:
+      line = await self.stdin.readline()
+    if isinstance(line, bytes):
+      line = line.decode()
+    return line.rstrip('\r\n')
+
+  ###################################
+
+  async def builtin_print(self, builtin, exec_ctx):
+    await self.write(str(exec_ctx.symbol_table.get('value')) + '\n', exec_ctx)
+    return RunTimeResult().success(Number.null)
+
+  async def builtin_input(self, builtin, exec_ctx):
+    return RunTimeResult().success(String(await self.read_line(exec_ctx)))
+
+  async def builtin_input_int(self, builtin, exec_ctx):
+    while True:
+      text = await self.read_line(exec_ctx)
+      try:
+        number = int(text)
+        break
+      except ValueError:
+        await self.write(f"'{text}' must be an integer. Try again!\n", exec_ctx)
+    return RunTimeResult().success(Number(number))
+
+  async def builtin_sleep(self, builtin, exec_ctx):
+    seconds = exec_ctx.symbol_table.get("seconds")
+
+    if not isinstance(seconds, Number):
+      return RunTimeResult().failure(RunTimeError(
+        builtin.start, builtin.end,
+        "Argument must be a number",
+        exec_ctx
+      ))
+
+    remaining = exec_ctx.quota.remaining() if exec_ctx.quota else None
+    if remaining is not None and seconds.value > remaining:
+      await asyncio.sleep(remaining)
+      return RunTimeResult().failure(RunTimeError(
+        builtin.start, builtin.end,
+        f"Time limit of {exec_ctx.quota.limits.max_seconds}s exceeded",
+        exec_ctx
+      ))
+
+    await asyncio.sleep(max(seconds.value, 0))
+    return RunTimeResult().success(Number.null)
+
+  async def builtin_spawn(self, builtin, exec_ctx):
+    func = exec_ctx.symbol_table.get("func")
+
+    if not isinstance(func, BaseFunction):
+      return RunTimeResult().failure(RunTimeError(
+        builtin.start, builtin.end,
+        "Argument must be a function",
+        exec_ctx
+      ))
+
+    interpreter = AsyncInterpreter(self.stdin, self.stdout, self.yield_interval)
+    future = asyncio.ensure_future(interpreter.call(func, []))
+    return RunTimeResult().success(Task(func.name, future=future))
+
+  async def builtin_wait(self, builtin, exec_ctx):
+    task = exec_ctx.symbol_table.get("task")
+
+    if not isinstance(task, Task):
+      return RunTimeResult().failure(RunTimeError(
+        builtin.start, builtin.end,
+        "Argument must be a task",
+        exec_ctx
+      ))
+
+    result = task.result if task.future == None else await task.future
+    if result.error: return RunTimeResult().failure(result.error)
+    return RunTimeResult().success(result.value)
+
+class AsyncEngine:
+  def __init__(self, base=None, yield_interval=100, limits=None):
+    self.base = base if base is not None else global_symbol_table
+    self.yield_interval = yield_interval
+    self.limits = limits
+
+  def new_environment(self):
+    return Environment(self.base)
+
+  async def run(self, source, fn='<async>', environment=None, stdin=None, stdout=None, limits=None, stats=None, output=None):
+    owned = environment is None
+    if owned:
+      environment = self.new_environment()
+    if limits is None:
+      limits = self.limits
+    if stats is None and metrics.registry:
+      stats = RunStats()
+    if output is None:
+      output = OutputSink(text_target(stdout))
+    interpreter = AsyncInterpreter(stdin, stdout, self.yield_interval)
+
+    start = time.perf_counter()
+    evaluated = None
+    value = None
+
+    try:
+      node, error = parse(fn, source, stats)
+      if not error:
+        context = Context('<program>')
+        context.symbol_table = environment.symbol_table
+        context.quota = Quota(limits) if limits is not None else None
+        context.stats = stats
+        context.output = output
+        evaluated = time.perf_counter()
+        result = await interpreter.visit(node, context)
+        value, error = result.value, result.error
+      if stats: stats.error = error.error_name if error else None
+    except BaseException as e:
+      if stats: stats.error = type(e).__name__
+      raise
+    finally:
+      output.flush()
+      if owned: environment.release()
+      if stats:
+        if evaluated is not None:
+          stats.eval += time.perf_counter() - evaluated
+        metrics.record(stats)
+    await interpreter.drain()
+    return RunResult(fn, value, error, time.perf_counter() - start, stats)
+
+  def submit(self, source, fn='<async>', environment=None, stdin=None, stdout=None, limits=None, stats=None, output=None):
+    return asyncio.ensure_future(self.run(source, fn, environment, stdin, stdout, limits, stats, output))
@@ -0,0 +1,158 @@
+from context import Environment
+from interpreter import parse, evaluate, global_symbol_table
+from quota import Limits, Quota
+from output import OutputSink
+from profiler import Profiler
+from memprofile import MemoryProfiler
+from metrics import RunStats, Registry
+from functools import partial
+import argparse
+import glob
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+program_cache = {}
+
+def load_program(path, stats=None):
+  # A cache hit reports the lex/parse times and tokens of the parse that
+  # filled the entry, so per-script stats do not depend on job order.
+  stat = os.stat(path)
+  key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+  cached = program_cache.get(key, None)
+
+  if not cached:
+    with open(path, 'r') as f:
+      source = f.read()
+    parsed = RunStats()
+    cached = program_cache[key] = (parse(path, source, parsed), parsed)
+
+  program, parsed = cached
+  if stats:
+    stats.lex = parsed.lex
+    stats.parse = parsed.parse
+    stats.tokens = parsed.tokens
+  return program
+
+def run_job(path, limits=None, profile=None, memory=None, name=None):
+  start = time.perf_counter()
+  report = {'file': path, 'worker': os.getpid()}
+  output = io.StringIO()
+  profiler = Profiler() if profile else None
+  memory_profiler = MemoryProfiler() if memory else None
+  hooks = [hook for hook in (profiler, memory_profiler) if hook]
+  stats = RunStats()
+
+  try:
+    node, error = load_program(path, stats)
+    parsed = time.perf_counter()
+
+    if not error:
+      quota = Quota(limits) if limits is not None else None
+      environment = Environment(global_symbol_table)
+      try:
+        value, error = evaluate(node, environment.symbol_table, quota, OutputSink(output, 'block'), hooks, stats)
+      finally:
+        environment.release()
+      stats.eval = time.perf_counter() - parsed
+
+    stats.error = error.error_name if error else None
+    report['ok'] = error == None
+    if error:
+      report['error'] = error.arrow_string()
+    elif value:
+      report['result'] = repr(value.elements[0]) if len(value.elements) == 1 else repr(value)
+    report['parse_time'] = parsed - start
+
+    name = name if name is not None else os.path.basename(path)
+    if profiler:
+      prefix = report_path(profile, name)
+      profiler.write_collapsed(prefix + '.folded')
+      profiler.write_report(prefix + '.prof.txt')
+      report['profile'] = {'collapsed': prefix + '.folded', 'report': prefix + '.prof.txt'}
+    if memory_profiler:
+      report['memory'] = report_path(memory, name) + '.mem.txt'
+      memory_profiler.write_report(report['memory'])
+  except Exception as e:
+    report['ok'] = False
+    report['error'] = f'{type(e).__name__}: {e}'
+    stats.error = type(e).__name__
+
+  report['stats'] = stats.as_dict()
+  report['output'] = output.getvalue()
+  report['elapsed'] = time.perf_counter() - start
+  return report
+
+def run_entry(entry, **options):
+  path, name = entry
+  return run_job(path, name=name, **options)
+
+def report_path(directory, name):
+  path = os.path.join(directory, name)
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  return path
+
+def report_names(paths):
+  # Report files keep each script's path below the scripts' common
+  # directory, so a/x.myopl and b/x.myopl do not overwrite each other; a
+  # script listed more than once gets a numbered suffix.
+  full = [os.path.abspath(path) for path in paths]
+  base = os.path.commonpath([os.path.dirname(path) for path in full]) if full else ''
+  names = []
+  seen = {}
+  for path in full:
+    name = os.path.relpath(path, base)
+    seen[name] = seen.get(name, 0) + 1
+    names.append(name if seen[name] == 1 else f'{name}.{seen[name]}')
+  return names
+
+def expand_paths(patterns):
+  paths = []
+  for pattern in patterns:
+    matches = sorted(glob.glob(pattern))
+    paths.extend(matches if matches else [pattern])
+  return paths
+
+def main(argv=None):
+  arg_parser = argparse.ArgumentParser(description='Run many .myopl scripts in a pool of worker processes.')
+  arg_parser.add_argument('paths', nargs='+', help='script files or glob patterns')
+  arg_parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='number of worker processes')
+  arg_parser.add_argument('--max-steps', type=int, help='loop iterations plus calls allowed per script')
+  arg_parser.add_argument('--timeout', type=float, help='wall-clock seconds allowed per script')
+  arg_parser.add_argument('--max-depth', type=int, help='call depth allowed per script')
+  arg_parser.add_argument('--max-bytes', type=int, help='approximate bytes a script may allocate')
+  arg_parser.add_argument('--profile', metavar='DIR', help='write a collapsed-stack profile and a text report per script to DIR')
+  arg_parser.add_argument('--memory', metavar='DIR', help='write a memory report per script to DIR')
+  arg_parser.add_argument('--metrics', metavar='FILE', help='write Prometheus metrics over all scripts to FILE')
+  args = arg_parser.parse_args(argv)
+
+  limits = Limits(args.max_steps, args.timeout, args.max_depth, args.max_bytes)
+  if all(value is None for value in vars(limits).values()):
+    limits = None
+
+  paths = expand_paths(args.paths)
+  for directory in (args.profile, args.memory):
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+  methods = multiprocessing.get_all_start_methods()
+  mp_context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+  registry = Registry() if args.metrics else None
+  failed = 0
+
+  with mp_context.Pool(processes=max(1, args.jobs)) as pool:
+    jobs = zip(paths, report_names(paths))
+    for report in pool.imap_unordered(partial(run_entry, limits=limits, profile=args.profile, memory=args.memory), jobs):
+      failed += not report['ok']
+      if registry: registry.record(RunStats.from_dict(report['stats']))
+      sys.stdout.write(json.dumps(report) + '\n')
+      sys.stdout.flush()
+
+  if registry:
+    registry.write(args.metrics)
+  return 1 if failed else 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,35 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interpreter import run
+
+PROGRAM = '''func work(n)
+  let acc = 0
+  for i = 0 to n do
+    let acc = acc + length([i]) + incr(i) + decr(i)
+    if is_num(acc) do let acc = acc
+  end
+  return acc
+end
+func outer(d, n) >> if d == 0 do work(n) last outer(d - 1, n)
+outer({depth}, {n})
+'''
+
+def bench(depth, n):
+  start = time.perf_counter()
+  _, error = run(f'<bench depth {depth}>', PROGRAM.format(depth=depth, n=n))
+  elapsed = time.perf_counter() - start
+
+  if error:
+    print(error.arrow_string())
+    return
+
+  print(f'depth={depth:<3} n={n:<8} {elapsed:8.3f}s  {elapsed / (n * 4) * 1e6:7.3f}us/builtin call')
+
+if __name__ == '__main__':
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+  for depth in (0, 10, 50):
+    bench(depth, n)
@@ -0,0 +1,36 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interpreter import run
+
+PROGRAMS = {
+  'read_numbers': 'let numbers = read_numbers("{path}")',
+  'read_line':    'let f = open("{path}", "r"); let line = read_line(f); while is_string(line) do; let line = read_line(f); end; close(f)',
+}
+
+def bench(name, path, n):
+  start = time.perf_counter()
+  _, error = run(f'<bench {name}>', PROGRAMS[name].format(path=path))
+  elapsed = time.perf_counter() - start
+
+  if error:
+    print(error.arrow_string())
+    return
+
+  print(f'{name:12} n={n:<9} {elapsed:8.3f}s  {elapsed / n * 1e6:7.3f}us/line')
+
+if __name__ == '__main__':
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+
+  with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+    f.writelines(f'{i * 7 % 1000003}\n' for i in range(n))
+
+  try:
+    for name in PROGRAMS:
+      bench(name, f.name, n)
+  finally:
+    os.remove(f.name)
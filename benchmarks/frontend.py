@@ -0,0 +1,126 @@
+import argparse
+import gc
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexical_analysis import LexicalAnalyzer
+from syntax_analysis import Parser
+from synthetic import SHAPES, generate, parse_size, format_size
+import nodes
+
+def count_nodes(root):
+  # Iterative, since a long operator chain is a very deep left-nested tree.
+  count = 0
+  stack = [root]
+  while stack:
+    value = stack.pop()
+    if isinstance(value, (list, tuple)):
+      stack.extend(value)
+    elif type(value).__module__ == nodes.__name__:
+      count += 1
+      stack.extend(vars(value).values())
+  return count
+
+def lex(text):
+  tokens, error = LexicalAnalyzer('<frontend>', text).init_tokens()
+  if error: raise RuntimeError(error.arrow_string())
+  return tokens
+
+def parse(tokens):
+  result = Parser(tokens).parse()
+  if result.error: raise RuntimeError(result.error.arrow_string())
+  return result.node
+
+def best_of(repeat, function, *args):
+  best = None
+  for _ in range(repeat):
+    gc.collect()
+    start = time.perf_counter()
+    value = function(*args)
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best, value
+
+def parse_peak(tokens):
+  gc.collect()
+  tracemalloc.start()
+  try:
+    parse(tokens)
+    return tracemalloc.get_traced_memory()[1]
+  finally:
+    tracemalloc.stop()
+
+def measure(shape, size, repeat):
+  text = generate(shape, size)
+  lex_time, tokens = best_of(repeat, lex, text)
+  parse_time, node = best_of(repeat, parse, tokens)
+  return {
+    'size': len(text),
+    'tokens': len(tokens),
+    'nodes': count_nodes(node),
+    'lex': lex_time,
+    'parse': parse_time,
+    'peak': parse_peak(tokens),
+  }
+
+def exponent(rows, key):
+  # Least-squares slope of log(time) against log(size): about 1 for linear
+  # work, 2 for quadratic.
+  points = [(math.log(row['size']), math.log(row[key])) for row in rows if row[key] > 0]
+  if len(points) < 2: return None
+  mean_x = sum(x for x, _ in points) / len(points)
+  mean_y = sum(y for _, y in points) / len(points)
+  spread = sum((x - mean_x) ** 2 for x, _ in points)
+  if spread == 0: return None
+  return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+def sizes_between(low, high, factor):
+  sizes = []
+  size = low
+  while size <= high:
+    sizes.append(size)
+    size *= factor
+  return sizes
+
+def main(argv=None):
+  arg_parser = argparse.ArgumentParser(description='Measure lexer and parser throughput on synthetic sources.')
+  arg_parser.add_argument('--shapes', default=','.join(SHAPES), help='comma separated shapes')
+  arg_parser.add_argument('--min-size', default='1K', help='smallest source (e.g. 1K)')
+  arg_parser.add_argument('--max-size', default='1M', help='largest source (up to 100M; needs many GB of memory)')
+  arg_parser.add_argument('--factor', type=int, default=4, help='growth between sizes')
+  arg_parser.add_argument('--repeat', type=int, default=3, help='runs per measurement, best kept')
+  arg_parser.add_argument('--threshold', type=float, default=1.15, help='scaling exponent reported as super-linear')
+  args = arg_parser.parse_args(argv)
+
+  sizes = sizes_between(parse_size(args.min_size), parse_size(args.max_size), args.factor)
+  flagged = 0
+
+  for shape in args.shapes.split(','):
+    rows = []
+    for size in sizes:
+      row = measure(shape, size, args.repeat)
+      rows.append(row)
+      print(
+        f'{shape:10} {format_size(row["size"]):>7}  '
+        f'{row["tokens"]:>9} tokens {row["tokens"] / row["lex"]:>12,.0f} tokens/s  '
+        f'{row["nodes"]:>9} nodes {row["nodes"] / row["parse"]:>12,.0f} nodes/s  '
+        f'peak {row["peak"] / (1 << 20):8.2f} MiB',
+        flush=True
+      )
+
+    for stage in ('lex', 'parse'):
+      slope = exponent(rows, stage)
+      if slope is None: continue
+      verdict = 'super-linear' if slope > args.threshold else 'ok'
+      flagged += verdict != 'ok'
+      print(f'{shape:10} {stage:5} scaling exponent {slope:.2f}  {verdict}')
+
+  return 1 if flagged else 0
+
+if __name__ == '__main__':
+  sys.exit(main())
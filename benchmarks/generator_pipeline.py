@@ -0,0 +1,40 @@
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interpreter import run
+
+PROGRAMS = {
+  'lists': '''
+func numbers(n); let out = []; for i in range(0, n, 1) do append(out, i); return out; end
+func squares(items); let out = []; for x in items do append(out, x * x); return out; end
+let total = 0; for x in squares(numbers({n})) do let total = total + x
+''',
+  'generators': '''
+func numbers(n); for i in range(0, n, 1) do yield i; end
+func squares(items); for x in items do yield x * x; end
+let total = 0; for x in squares(numbers({n})) do let total = total + x
+''',
+}
+
+def bench(name, n):
+  tracemalloc.start()
+  start = time.perf_counter()
+  _, error = run(f'<bench {name}>', PROGRAMS[name].format(n=n))
+  elapsed = time.perf_counter() - start
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  if error:
+    print(error.arrow_string())
+    return
+
+  print(f'{name:10} n={n:<9} {elapsed:8.3f}s  {elapsed / n * 1e6:7.3f}us/item  peak {peak / 2**20:7.2f}MiB')
+
+if __name__ == '__main__':
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5
+  for name in PROGRAMS:
+    bench(name, n)
@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interpreter import run
+from hooks import Hook
+from profiler import Profiler
+
+PROGRAM = '''func step(x) >> x * 2 - 1
+let acc = 0
+for i = 0 to {n} do
+  let acc = acc + step(i)
+end
+'''
+
+STATES = {
+  'off':      lambda: None,
+  'noop':     lambda: [Hook()],
+  'profiler': lambda: [Profiler()],
+}
+
+def bench(name, n, repeat=3):
+  best = None
+  for _ in range(repeat):
+    hooks = STATES[name]()
+    start = time.perf_counter()
+    _, error = run(f'<bench {name}>', PROGRAM.format(n=n), hooks=hooks)
+    elapsed = time.perf_counter() - start
+
+    if error:
+      print(error.arrow_string())
+      return None
+    best = elapsed if best is None else min(best, elapsed)
+
+  return best
+
+if __name__ == '__main__':
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+  baseline = None
+  for name in STATES:
+    elapsed = bench(name, n)
+    if elapsed is None: continue
+    baseline = baseline or elapsed
+    print(f'{name:9} n={n:<9} {elapsed:8.3f}s  {elapsed / n * 1e6:9.3f}us/iteration  x{elapsed / baseline:.2f}')
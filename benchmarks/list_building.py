@@ -0,0 +1,30 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interpreter import run
+
+PROGRAMS = {
+  'plus':   'let a = []; for i = 0 to {n} do let a = a + i',
+  'append': 'let a = []; for i = 0 to {n} do append(a, i)',
+  'concat': 'let a = []; for i = 0 to {n} change 4 do let a = a * [i, i, i, i]',
+  'pop':    'let a = []; for i = 0 to {n} do append(a, i); for i = 0 to {n} do let a = a - -1',
+}
+
+def bench(name, n):
+  start = time.perf_counter()
+  _, error = run(f'<bench {name}>', PROGRAMS[name].format(n=n))
+  elapsed = time.perf_counter() - start
+
+  if error:
+    print(error.arrow_string())
+    return
+
+  print(f'{name:8} n={n:<9} {elapsed:8.3f}s  {elapsed / n * 1e6:7.3f}us/element')
+
+if __name__ == '__main__':
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+  for name in PROGRAMS:
+    bench(name, n)
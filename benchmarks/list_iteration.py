@@ -0,0 +1,30 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interpreter import run
+
+PROGRAMS = {
+  'index':    'let total = 0; for i = 0 to length(items) do let total = total + items / i',
+  'for_in':   'let total = 0; for x in items do let total = total + x',
+  'range':    'let total = 0; for i in range(0, {n}, 1) do let total = total + i',
+}
+
+def bench(name, n):
+  source = 'let items = []; for i = 0 to {n} do append(items, i); '.format(n=n) + PROGRAMS[name].format(n=n)
+  start = time.perf_counter()
+  _, error = run(f'<bench {name}>', source)
+  elapsed = time.perf_counter() - start
+
+  if error:
+    print(error.arrow_string())
+    return
+
+  print(f'{name:8} n={n:<9} {elapsed:8.3f}s  {elapsed / n * 1e6:7.3f}us/item')
+
+if __name__ == '__main__':
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 2 * 10 ** 5
+  for name in PROGRAMS:
+    bench(name, n)
@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interpreter import run
+
+LIBRARY = ''.join(f'func helper_{i}(x) >> x * {i} + {i}\n' for i in range(200))
+
+PROGRAMS = {
+  'run':    'for i = 0 to {n} do; run("{path}"); let y = helper_7(i); end',
+  'import': 'for i = 0 to {n} do; let lib = import("{path}"); let y = lib.helper_7(i); end',
+}
+
+def bench(name, path, n):
+  start = time.perf_counter()
+  _, error = run(f'<bench {name}>', PROGRAMS[name].format(n=n, path=path))
+  elapsed = time.perf_counter() - start
+
+  if error:
+    print(error.arrow_string())
+    return
+
+  print(f'{name:8} n={n:<9} {elapsed:8.3f}s  {elapsed / n * 1e6:9.3f}us/load')
+
+if __name__ == '__main__':
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+  with tempfile.NamedTemporaryFile('w', suffix='.myopl', delete=False) as f:
+    f.write(LIBRARY)
+
+  try:
+    for name in PROGRAMS:
+      bench(name, f.name, n)
+  finally:
+    os.remove(f.name)
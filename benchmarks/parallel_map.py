@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parallel
+from interpreter import run
+
+PROGRAM = '''func burn(x)
+  let acc = 0
+  for i = 0 to {work} do let acc = acc + (i * x) % 7
+  return acc
+end
+let items = []
+for i = 0 to {n} do append(items, i)
+let out = pmap(burn, items)
+'''
+
+def bench(workers, n, work):
+  parallel.configure(workers=workers, min_items=2)
+  run('<warm up>', PROGRAM.format(n=workers * 2, work=1))
+
+  start = time.perf_counter()
+  _, error = run(f'<bench workers {workers}>', PROGRAM.format(n=n, work=work))
+  elapsed = time.perf_counter() - start
+
+  if error:
+    print(error.arrow_string())
+    return None
+
+  return elapsed
+
+if __name__ == '__main__':
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+  work = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+  cpus = os.cpu_count() or 1
+
+  worker_counts = sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+  baseline = None
+  for workers in worker_counts:
+    elapsed = bench(workers, n, work)
+    if elapsed is None: continue
+    baseline = baseline or elapsed
+    print(f'workers={workers:<3} n={n:<6} {elapsed:8.3f}s  speedup {baseline / elapsed:5.2f}x')
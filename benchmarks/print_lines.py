@@ -0,0 +1,36 @@
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interpreter import run
+from output import OutputSink
+
+PROGRAM = 'for i = 0 to {n} do print("line " + to_string(i))'
+
+def bench(name, n, make_sink):
+  with open(os.devnull, 'w') as devnull:
+    sink = make_sink(devnull)
+    start = time.perf_counter()
+    _, error = run(f'<bench {name}>', PROGRAM.format(n=n), output=sink)
+    elapsed = time.perf_counter() - start
+
+  if error:
+    print(error.arrow_string())
+    return
+
+  print(f'{name:8} n={n:<9} {elapsed:8.3f}s  {elapsed / n * 1e6:7.3f}us/line')
+
+SINKS = {
+  'line':   lambda devnull: OutputSink(devnull, 'line'),
+  'block':  lambda devnull: OutputSink(devnull, 'block'),
+  'memory': lambda devnull: OutputSink(io.StringIO(), 'block'),
+  'discard': lambda devnull: OutputSink(lambda text: None, 'block'),
+}
+
+if __name__ == '__main__':
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+  for name, make_sink in SINKS.items():
+    bench(name, n, make_sink)
@@ -0,0 +1,46 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Milliseconds the interpreter may add on top of a bare `print(1)` in
+# Python before the result shows up. Raise it only on purpose.
+BUDGET_MS = 25
+
+COMMANDS = {
+  'python': 'print(1)',
+  'ozen':   'from interpreter import run; run("<startup>", "print(1)")',
+}
+
+def first_result(code):
+  # Wall time from launch until the first line of output arrives.
+  start = time.perf_counter()
+  process = subprocess.Popen([sys.executable, '-c', code], cwd=ROOT, stdout=subprocess.PIPE)
+  line = process.stdout.readline()
+  elapsed = time.perf_counter() - start
+  process.communicate()
+
+  if line.strip() != b'1':
+    raise RuntimeError(f'unexpected output {line!r} from {code!r}')
+  return elapsed
+
+def bench(name, n):
+  times = [first_result(COMMANDS[name]) for _ in range(n)]
+  median = statistics.median(times)
+  print(f'{name:8} n={n:<9} {median * 1e3:8.3f}ms median  {min(times) * 1e3:8.3f}ms min')
+  return median
+
+if __name__ == '__main__':
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+  baseline = bench('python', n)
+  median = bench('ozen', n)
+  overhead = (median - baseline) * 1e3
+
+  print(f'overhead {overhead:.3f}ms (budget {BUDGET_MS}ms)')
+  if overhead > BUDGET_MS:
+    print('startup budget exceeded')
+    sys.exit(1)
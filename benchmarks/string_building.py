@@ -0,0 +1,29 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interpreter import run
+
+PROGRAMS = {
+  'concat':  'let s = ""; for i = 0 to {n} do let s = s + "report line " + to_string(i) + "\\n"; let out = to_string(s)',
+  'builder': 'let b = string_builder(); for i = 0 to {n} do append(b, "report line " + to_string(i) + "\\n"); let out = to_string(b)',
+  'repeat':  'let s = "0123456789abcdef" * {n}; let out = to_string(s)',
+}
+
+def bench(name, n):
+  start = time.perf_counter()
+  _, error = run(f'<bench {name}>', PROGRAMS[name].format(n=n))
+  elapsed = time.perf_counter() - start
+
+  if error:
+    print(error.arrow_string())
+    return
+
+  print(f'{name:8} n={n:<9} {elapsed:8.3f}s  {elapsed / n * 1e6:7.3f}us/piece')
+
+if __name__ == '__main__':
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 2 * 10 ** 5
+  for name in PROGRAMS:
+    bench(name, n)
@@ -0,0 +1,165 @@
+import argparse
+import asyncio
+import fnmatch
+import gc
+import glob
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROGRAMS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'programs')
+
+sys.path.insert(0, ROOT)
+
+from interpreter import run
+from engine import Engine
+from async_engine import AsyncEngine
+
+class Engines:
+  # Every way a program can be executed, each behind a run(fn, source)
+  # that returns (value, error). They are created once and reused, so a
+  # measurement never includes engine or event loop start-up.
+  def __init__(self):
+    self.engine = Engine(max_workers=1)
+    self.async_engine = AsyncEngine()
+    self.loop = asyncio.new_event_loop()
+
+  def interpreter(self, fn, source):
+    return run(fn, source)
+
+  def threaded(self, fn, source):
+    result = self.engine.submit(source, fn).result()
+    return result.value, result.error
+
+  def asynchronous(self, fn, source):
+    result = self.loop.run_until_complete(self.async_engine.run(source, fn))
+    return result.value, result.error
+
+  def get(self, name):
+    return {'interpreter': self.interpreter, 'engine': self.threaded, 'async': self.asynchronous}[name]
+
+  def close(self):
+    self.engine.shutdown()
+    self.loop.close()
+
+ENGINE_NAMES = ('interpreter', 'engine', 'async')
+
+def load_programs(patterns):
+  programs = {}
+  for path in sorted(glob.glob(os.path.join(PROGRAMS, '*.myopl'))):
+    name = os.path.splitext(os.path.basename(path))[0]
+    if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns): continue
+    with open(path, 'r', encoding='utf-8') as f:
+      programs[name] = (path, f.read())
+  return programs
+
+def run_once(execute, path, source):
+  value, error = execute(path, source)
+  if error: raise RuntimeError(error.arrow_string())
+
+def measure(execute, path, source, warmup, repeat):
+  # Warm-up runs fill the caches (bytecode, builtin lookups, allocator)
+  # and are dropped. Each timed run starts from a collected heap, and a
+  # separate traced run gives the peak, since tracemalloc slows the run
+  # it watches.
+  for _ in range(warmup):
+    run_once(execute, path, source)
+
+  samples = []
+  for _ in range(repeat):
+    gc.collect()
+    start = time.perf_counter()
+    run_once(execute, path, source)
+    samples.append(time.perf_counter() - start)
+
+  gc.collect()
+  tracemalloc.start()
+  try:
+    run_once(execute, path, source)
+    peak = tracemalloc.get_traced_memory()[1]
+  finally:
+    tracemalloc.stop()
+
+  q1, median, q3 = statistics.quantiles(samples, n=4) if len(samples) > 1 else samples * 3
+  return {
+    'median': median,
+    'q1': q1,
+    'q3': q3,
+    'min': min(samples),
+    'mean': statistics.fmean(samples),
+    'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    'samples': len(samples),
+    'peak': peak,
+  }
+
+def compare(result, baseline, threshold):
+  # Slower/faster only when the medians differ by more than the threshold
+  # and the interquartile ranges do not overlap; anything else is noise.
+  ratio = result['median'] / baseline['median']
+  if ratio > 1 + threshold and result['q1'] > baseline['q3']:
+    return ratio, 'slower'
+  if ratio < 1 - threshold and result['q3'] < baseline['q1']:
+    return ratio, 'faster'
+  return ratio, 'same'
+
+def main(argv=None):
+  arg_parser = argparse.ArgumentParser(description='Run the ozen benchmark programs on every execution engine.')
+  arg_parser.add_argument('-k', dest='patterns', action='append', help='only programs matching this glob (repeatable)')
+  arg_parser.add_argument('--engines', default=','.join(ENGINE_NAMES), help='comma separated engines to run')
+  arg_parser.add_argument('--warmup', type=int, default=2, help='untimed runs before measuring')
+  arg_parser.add_argument('--repeat', type=int, default=10, help='timed runs per program and engine')
+  arg_parser.add_argument('--save', metavar='FILE', help='write the results as a JSON baseline')
+  arg_parser.add_argument('--compare', metavar='FILE', help='compare against a JSON baseline')
+  arg_parser.add_argument('--threshold', type=float, default=0.1, help='relative change reported as slower/faster')
+  args = arg_parser.parse_args(argv)
+
+  engine_names = [name.strip() for name in args.engines.split(',') if name.strip()]
+  unknown = [name for name in engine_names if name not in ENGINE_NAMES]
+  if unknown:
+    arg_parser.error(f'unknown engines: {", ".join(unknown)} (available: {", ".join(ENGINE_NAMES)})')
+
+  baseline = None
+  if args.compare:
+    with open(args.compare, 'r', encoding='utf-8') as f:
+      baseline = json.load(f)['results']
+
+  programs = load_programs(args.patterns)
+  engines = Engines()
+  results = {}
+  slower = 0
+
+  try:
+    for name, (path, source) in programs.items():
+      for engine_name in engine_names:
+        key = f'{name}/{engine_name}'
+        result = results[key] = measure(engines.get(engine_name), path, source, args.warmup, args.repeat)
+        spread = (result['q3'] - result['q1']) * 1e3
+
+        line = f'{key:32} {result["median"] * 1e3:9.3f}ms ±{spread:7.3f}  peak {result["peak"] / 1024:9.1f} KiB'
+        if baseline and key in baseline:
+          ratio, verdict = compare(result, baseline[key], args.threshold)
+          slower += verdict == 'slower'
+          line += f'  x{ratio:.3f} {verdict}'
+        print(line, flush=True)
+  finally:
+    engines.close()
+
+  if args.save:
+    with open(args.save, 'w', encoding='utf-8') as f:
+      json.dump({
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'warmup': args.warmup,
+        'repeat': args.repeat,
+        'results': results,
+      }, f, indent=2)
+
+  return 1 if slower else 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,86 @@
+import argparse
+import itertools
+import os
+import sys
+
+# Synthetic .myopl sources of a requested size, one shape per front-end
+# stress: many short statements, deeply nested expressions, one long
+# operator chain, one huge list literal and one long string literal.
+
+NESTING_DEPTH = 24
+OPERATORS = ('+', '-', '*', '+', '%')
+
+def statements(size):
+  lines = (f'let v{i % 997} = {i % 89} + {i % 13} * v{i % 997}\n' for i in itertools.count())
+  return fill(lines, size)
+
+def nesting(size):
+  # Nested as deep as one statement can go before the recursive-descent
+  # parser runs into Python's recursion limit; size comes from repeats.
+  depth = NESTING_DEPTH
+  line = f'let x = {"(" * depth}1{" + 1)" * depth}\nlet y = {"[" * depth}1{"]" * depth}\n'
+  return fill(itertools.repeat(line), size)
+
+def operators(size):
+  parts = (f' {OPERATORS[i % len(OPERATORS)]} {i % 97 + 1}' for i in itertools.count())
+  return fill(parts, size - 2, 'let x = 1') + '\n'
+
+def list_literal(size):
+  parts = (f', {i % 1000}' for i in itertools.count())
+  return fill(parts, size - 2, 'let items = [0') + ']\n'
+
+def string_literal(size):
+  body = 'the quick brown fox jumps over the lazy dog. '
+  count = max(1, (size - 12) // len(body))
+  return 'let text = "' + body * count + '"\n'
+
+SHAPES = {
+  'statements': statements,
+  'nesting': nesting,
+  'operators': operators,
+  'list': list_literal,
+  'string': string_literal,
+}
+
+def fill(pieces, size, prefix=''):
+  # Joins pieces until the text reaches size characters.
+  parts = [prefix]
+  total = len(prefix)
+  for piece in pieces:
+    if total >= size: break
+    parts.append(piece)
+    total += len(piece)
+  return ''.join(parts)
+
+def generate(shape, size):
+  return SHAPES[shape](size)
+
+def parse_size(text):
+  units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+  text = text.strip().upper().rstrip('B')
+  if text and text[-1] in units:
+    return int(float(text[:-1]) * units[text[-1]])
+  return int(text)
+
+def format_size(size):
+  for unit, scale in (('M', 1 << 20), ('K', 1 << 10)):
+    if size >= scale: return f'{size / scale:.1f}{unit}'
+  return str(size)
+
+def main(argv=None):
+  arg_parser = argparse.ArgumentParser(description='Write synthetic .myopl sources for front-end benchmarks.')
+  arg_parser.add_argument('directory', help='where to write the files')
+  arg_parser.add_argument('--shapes', default=','.join(SHAPES), help='comma separated shapes')
+  arg_parser.add_argument('--sizes', default='1K,10K,100K,1M,10M,100M', help='comma separated sizes')
+  args = arg_parser.parse_args(argv)
+
+  os.makedirs(args.directory, exist_ok=True)
+  for shape in args.shapes.split(','):
+    for size in map(parse_size, args.sizes.split(',')):
+      path = os.path.join(args.directory, f'{shape}-{format_size(size)}.myopl')
+      with open(path, 'w', encoding='utf-8') as f:
+        f.write(generate(shape, size))
+      print(path)
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -1,4 +1,7 @@
 from datatype import Number
+import itertools
+
+global_versions = itertools.count(1)
 
 class Context:
   def __init__(self, display_name, parent=None, parent_entry_pos=None):
@@ -6,20 +9,134 @@ class Context:
     self.parent = parent
     self.parent_entry_pos = parent_entry_pos
     self.symbol_table = None
+    self.quota = parent.quota if parent else None
+    self.output = parent.output if parent else None
+    self.hooks = parent.hooks if parent else None
+    self.stats = parent.stats if parent else None
+    self.depth = parent.depth + 1 if parent else 0
+
+  def rebind(self, symbol_table):
+    # This context with names resolved in another table: what a module's
+    # members are called from. It takes this context's place in tracebacks
+    # and call depth.
+    context = Context(self.display_name, self.parent, self.parent_entry_pos)
+    context.symbol_table = symbol_table
+    context.quota = self.quota
+    context.output = self.output
+    context.hooks = self.hooks
+    context.stats = self.stats
+    context.depth = self.depth
+    return context
+
+class Resources:
+  # What the runs in one environment have loaded or created: their
+  # imported modules by path, the shared buffers they own, which are
+  # unlinked when the environment is released, and their pmap_config
+  # choices. Module namespaces share their importer's.
+  def __init__(self):
+    self.modules = {}
+    self.buffers = []
+    self.pmap = {}
+
+  def release(self):
+    buffers, self.buffers = self.buffers, []
+    for buffer in buffers:
+      buffer.release()
 
 class SymbolTable:
-  def __init__(self, parent=None):
+  global_version = next(global_versions)
+
+  def __init__(self, parent=None, is_global=False):
     self.symbols = {}
     self.parent = parent
+    self.is_global = is_global
+    self.loader = None
+    self.resources = None
 
   def get(self, name):
     value = self.symbols.get(name, None)
+    if value == None and self.loader:
+      value = self.load(name)
     if value == None and self.parent:
       return self.parent.get(name)
     return value
 
+  def lookup(self, name, node):
+    # Local scopes are searched every time; the global layers are resolved
+    # once per access site and cached until a global name is added/removed.
+    table = self
+    while not table.is_global:
+      value = table.symbols.get(name, None)
+      if value != None: return value
+      table = table.parent
+      if table == None: return None
+
+    cache = node.global_cache
+    if cache == None or cache[0] != SymbolTable.global_version or cache[1] is not table:
+      version = SymbolTable.global_version
+      owner = table
+      while owner and name not in owner.symbols and owner.load(name) == None:
+        owner = owner.parent
+      cache = node.global_cache = (version, table, owner.symbols if owner else None)
+
+    return cache[2].get(name, None) if cache[2] != None else None
+
+  def run_resources(self):
+    if self.resources is None:
+      self.resources = Resources()
+    return self.resources
+
+  def load(self, name):
+    # Names the loader knows (the builtins) are only created the first time
+    # they are looked up, then stored like any other symbol.
+    if not self.loader: return None
+    value = self.loader(name)
+    if value != None:
+      self.set(name, value)
+    return value
+
   def set(self, name, value):
+    is_new = name not in self.symbols
     self.symbols[name] = value
+    if is_new and self.is_global:
+      SymbolTable.bump_global_version()
 
   def remove(self, name):
     del self.symbols[name]
+    if self.is_global:
+      SymbolTable.bump_global_version()
+
+  @staticmethod
+  def bump_global_version():
+    SymbolTable.global_version = next(global_versions)
+
+class Environment:
+  # A private global scope layered over a shared base table: creating one
+  # is O(1), reads fall through to the base and writes stay in the layer.
+  def __init__(self, base):
+    self.base = base
+    self.symbol_table = None
+    self.reset()
+
+  def reset(self):
+    if self.symbol_table:
+      self.release()
+    self.symbol_table = SymbolTable(self.base, is_global=True)
+
+  def release(self):
+    # Unlinks the buffers its runs created. run() and the engines do this
+    # when a run ends in an environment they made for it.
+    if self.symbol_table.resources:
+      self.symbol_table.resources.release()
+
+  def snapshot(self):
+    snapshot = SymbolTable(self.base, is_global=True)
+    snapshot.symbols = dict(self.symbol_table.symbols)
+    return snapshot
+
+  def restore(self, snapshot):
+    self.symbol_table.symbols = dict(snapshot.symbols)
+    SymbolTable.bump_global_version()
+
+  def fork(self):
+    return Environment(self.snapshot())
@@ -1,8 +1,16 @@
 from runtime import RunTimeResult
 from errors import RunTimeError
+from persistent_vector import PersistentVector
+from rope import concat_ropes, repeat_rope
 import math
+import sys
+import weakref
+
+STRING_INTERN_LIMIT = 64
 
 class Value:
+  __slots__ = ('start', 'end', 'context')
+
   def __init__(self):
     self.set_position()
     self.set_context()
@@ -70,6 +78,25 @@ class Value:
   def is_true(self):
     return False
 
+  def iterate(self):
+    # A Python iterator over the values a for-in loop visits, or None when
+    # the value cannot be iterated.
+    return None
+
+  def __getstate__(self):
+    # The context chain drags in whole symbol tables, so values cross
+    # process boundaries without it; the receiver sets a fresh context.
+    state = dict(getattr(self, '__dict__', {}))
+    for cls in type(self).__mro__:
+      for name in cls.__dict__.get('__slots__', ()):
+        if hasattr(self, name): state[name] = getattr(self, name)
+    state['context'] = None
+    return state
+
+  def __setstate__(self, state):
+    for name, value in state.items():
+      object.__setattr__(self, name, value)
+
   def illegal_operation(self, other=None):
     if not other: other = self
     return RunTimeError(
@@ -200,25 +227,82 @@ Number.math_PI = Number(math.pi)
 class String(Value):
   def __init__(self, value):
     super().__init__()
-    self.value = value
+    if isinstance(value, str) and len(value) <= STRING_INTERN_LIMIT:
+      value = sys.intern(value)
+    self.rope = value
+
+  @property
+  def value(self):
+    if not isinstance(self.rope, str):
+      self.rope = self.rope.flatten()
+    return self.rope
+
+  def equals(self, other):
+    if self.rope is other.rope: return True
+    if len(self.rope) != len(other.rope): return False
+    return self.value == other.value
 
   def addition(self, other):
     if isinstance(other, String):
-      return String(self.value + other.value).set_context(self.context), None
+      return String(concat_ropes(self.rope, other.rope)).set_context(self.context), None
     else:
       return None, Value.illegal_operation(self, other)
 
   def multiply(self, other):
-    if isinstance(other, Number):
-      return String(self.value * other.value).set_context(self.context), None
+    if isinstance(other, Number) and isinstance(other.value, int):
+      return String(repeat_rope(self.rope, other.value)).set_context(self.context), None
+    else:
+      return None, Value.illegal_operation(self, other)
+
+  def eq_compare(self, other):
+    if isinstance(other, String):
+      return Number(int(self.equals(other))).set_context(self.context), None
+    else:
+      return None, Value.illegal_operation(self, other)
+
+  def neq_compare(self, other):
+    if isinstance(other, String):
+      return Number(int(not self.equals(other))).set_context(self.context), None
+    else:
+      return None, Value.illegal_operation(self, other)
+
+  def lt_compare(self, other):
+    if isinstance(other, String):
+      return Number(int(self.value < other.value)).set_context(self.context), None
+    else:
+      return None, Value.illegal_operation(self, other)
+
+  def gt_compare(self, other):
+    if isinstance(other, String):
+      return Number(int(self.value > other.value)).set_context(self.context), None
+    else:
+      return None, Value.illegal_operation(self, other)
+
+  def lte_compare(self, other):
+    if isinstance(other, String):
+      return Number(int(self.value <= other.value)).set_context(self.context), None
+    else:
+      return None, Value.illegal_operation(self, other)
+
+  def gte_compare(self, other):
+    if isinstance(other, String):
+      return Number(int(self.value >= other.value)).set_context(self.context), None
     else:
       return None, Value.illegal_operation(self, other)
 
   def is_true(self):
-    return len(self.value) > 0
+    return len(self.rope) > 0
+
+  def iterate(self):
+    return (String(char) for char in self.value)
+
+  def __getstate__(self):
+    state = Value.__getstate__(self)
+    state['rope'] = self.value
+    return state
 
   def copy(self):
-    copy = String(self.value)
+    copy = String(self.rope)
     copy.set_position(self.start, self.end)
     copy.set_context(self.context)
     return copy
@@ -229,21 +313,49 @@ class String(Value):
   def __repr__(self):
     return f'"{self.value}"'
 
+class StringBuilder(Value):
+  def __init__(self, parts=None):
+    super().__init__()
+    self.parts = parts if parts is not None else []
+
+  def append(self, value):
+    self.parts.append(str(value))
+
+  def build(self):
+    if len(self.parts) > 1:
+      self.parts[:] = [''.join(self.parts)]
+    return self.parts[0] if self.parts else ''
+
+  def is_true(self):
+    return any(self.parts)
+
+  def copy(self):
+    copy = StringBuilder(self.parts)
+    copy.set_position(self.start, self.end)
+    copy.set_context(self.context)
+    return copy
+
+  def __str__(self):
+    return self.build()
+
+  def __repr__(self):
+    return f'<string builder "{self.build()}">'
+
 class List(Value):
   def __init__(self, elements):
     super().__init__()
-    self.elements = elements
+    self.elements = elements if isinstance(elements, PersistentVector) else PersistentVector(elements)
 
   def addition(self, other):
     new_list = self.copy()
-    new_list.elements.append(other)
+    new_list.elements = self.elements.appended(other)
     return new_list, None
 
   def subtraction(self, other):
     if isinstance(other, Number):
       new_list = self.copy()
       try:
-        new_list.elements.pop(other.value)
+        new_list.elements = self.elements.removed(other.value)
         return new_list, None
       except:
         return None, RunTimeError(
@@ -257,15 +369,27 @@ class List(Value):
   def multiply(self, other):
     if isinstance(other, List):
       new_list = self.copy()
-      new_list.elements.extend(other.elements)
+      new_list.elements = self.elements.concatenated(other.elements)
       return new_list, None
     else:
       return None, Value.illegal_operation(self, other)
 
+  def eq_compare(self, other):
+    if isinstance(other, List):
+      return Number(int(values_equal(self, other))).set_context(self.context), None
+    else:
+      return None, Value.illegal_operation(self, other)
+
+  def neq_compare(self, other):
+    if isinstance(other, List):
+      return Number(int(not values_equal(self, other))).set_context(self.context), None
+    else:
+      return None, Value.illegal_operation(self, other)
+
   def divide(self, other):
     if isinstance(other, Number):
       try:
-        return self.elements[other.value], None
+        return self.elements[other.value].copy(), None
       except:
         return None, RunTimeError(
           other.start, other.end,
@@ -275,6 +399,9 @@ class List(Value):
     else:
       return None, Value.illegal_operation(self, other)
   
+  def iterate(self):
+    return iter(self.elements.copy())
+
   def copy(self):
     copy = List(self.elements)
     copy.set_position(self.start, self.end)
@@ -285,4 +412,244 @@ class List(Value):
     return ", ".join([str(x) for x in self.elements])
 
   def __repr__(self):
-    return f'[{", ".join([repr(x) for x in self.elements])}]'
\ No newline at end of file
+    return f'[{", ".join([repr(x) for x in self.elements])}]'
+
+class Range(Value):
+  # The numbers start, start + step, ... up to end, never materialised:
+  # length, indexing and iteration all go through a Python range.
+  def __init__(self, range_):
+    super().__init__()
+    self.range = range_
+
+  def divide(self, other):
+    if isinstance(other, Number) and isinstance(other.value, int):
+      try:
+        return Number(self.range[other.value]).set_context(self.context), None
+      except IndexError:
+        return None, RunTimeError(
+          other.start, other.end,
+          'Index element is out of bounds',
+          self.context
+        )
+    else:
+      return None, Value.illegal_operation(self, other)
+
+  def is_true(self):
+    return len(self.range) > 0
+
+  def iterate(self):
+    return map(Number, self.range)
+
+  def copy(self):
+    copy = Range(self.range)
+    copy.set_position(self.start, self.end)
+    copy.set_context(self.context)
+    return copy
+
+  def __repr__(self):
+    return f'range({self.range.start}, {self.range.stop}, {self.range.step})'
+
+class Map(Value):
+  def __init__(self, entries):
+    super().__init__()
+    self.entries = entries
+
+  @staticmethod
+  def hash_key(key):
+    if isinstance(key, (Number, String)):
+      return key.value
+    return None
+
+  def key_error(self, key, details):
+    return RunTimeError(key.start, key.end, details, self.context)
+
+  def get(self, key):
+    hash_key = Map.hash_key(key)
+    if hash_key is None:
+      return None, self.key_error(key, 'Map keys must be numbers or strings')
+
+    entry = self.entries.get(hash_key, None)
+    if entry is None:
+      return None, self.key_error(key, f'Key {key!r} is not in the map')
+    return entry[1], None
+
+  def has(self, key):
+    hash_key = Map.hash_key(key)
+    return hash_key is not None and hash_key in self.entries
+
+  def set(self, key, value):
+    hash_key = Map.hash_key(key)
+    if hash_key is None:
+      return None, self.key_error(key, 'Map keys must be numbers or strings')
+
+    self.entries[hash_key] = (key, value)
+    return value, None
+
+  def delete(self, key):
+    hash_key = Map.hash_key(key)
+    if hash_key is None or hash_key not in self.entries:
+      return None, self.key_error(key, f'Key {key!r} is not in the map')
+    return self.entries.pop(hash_key)[1], None
+
+  def keys(self):
+    return [key for key, _ in self.entries.values()]
+
+  def values(self):
+    return [value for _, value in self.entries.values()]
+
+  def divide(self, other):
+    value, error = self.get(other)
+    if error: return None, error
+    return value.copy(), None
+
+  def eq_compare(self, other):
+    if isinstance(other, Map):
+      return Number(int(values_equal(self, other))).set_context(self.context), None
+    else:
+      return None, Value.illegal_operation(self, other)
+
+  def neq_compare(self, other):
+    if isinstance(other, Map):
+      return Number(int(not values_equal(self, other))).set_context(self.context), None
+    else:
+      return None, Value.illegal_operation(self, other)
+
+  def is_true(self):
+    return len(self.entries) > 0
+
+  def iterate(self):
+    return iter(self.keys())
+
+  def copy(self):
+    copy = Map(self.entries)
+    copy.set_position(self.start, self.end)
+    copy.set_context(self.context)
+    return copy
+
+  def __str__(self):
+    return ", ".join([f'{key}: {value}' for key, value in self.entries.values()])
+
+  def __repr__(self):
+    return f'{{{", ".join([f"{key!r}: {value!r}" for key, value in self.entries.values()])}}}'
+
+class RecordLayout:
+  # Interned by name and fields while any record type, record or cached
+  # field access still uses the layout; weak values let a long-running
+  # process that keeps declaring new records forget the unused ones.
+  __slots__ = ('name', 'field_names', 'offsets', '__weakref__')
+  layouts = weakref.WeakValueDictionary()
+
+  def __init__(self, name, field_names):
+    self.name = name
+    self.field_names = field_names
+    self.offsets = {field_name: i for i, field_name in enumerate(field_names)}
+
+  @staticmethod
+  def get(name, field_names):
+    key = (name, tuple(field_names))
+    layout = RecordLayout.layouts.get(key, None)
+    if layout is None:
+      layout = RecordLayout.layouts.setdefault(key, RecordLayout(name, list(field_names)))
+    return layout
+
+  def __reduce__(self):
+    return (RecordLayout.get, (self.name, tuple(self.field_names)))
+
+class Record(Value):
+  __slots__ = ('layout', 'fields')
+
+  def __init__(self, layout, fields):
+    super().__init__()
+    self.layout = layout
+    self.fields = fields
+
+  def eq_compare(self, other):
+    if isinstance(other, Record):
+      return Number(int(values_equal(self, other))).set_context(self.context), None
+    else:
+      return None, Value.illegal_operation(self, other)
+
+  def neq_compare(self, other):
+    if isinstance(other, Record):
+      return Number(int(not values_equal(self, other))).set_context(self.context), None
+    else:
+      return None, Value.illegal_operation(self, other)
+
+  def is_true(self):
+    return True
+
+  def copy(self):
+    copy = Record(self.layout, self.fields)
+    copy.set_position(self.start, self.end)
+    copy.set_context(self.context)
+    return copy
+
+  def __str__(self):
+    return self.__repr__()
+
+  def __repr__(self):
+    fields = ", ".join([f'{name}={value!r}' for name, value in zip(self.layout.field_names, self.fields)])
+    return f'{self.layout.name}({fields})'
+
+class Module(Value):
+  # The namespace left behind by running an imported file; members are read
+  # with '.', like record fields.
+  def __init__(self, name, path, symbol_table):
+    super().__init__()
+    self.name = name
+    self.path = path
+    self.symbol_table = symbol_table
+
+  def member(self, name):
+    return self.symbol_table.symbols.get(name, None)
+
+  def is_true(self):
+    return True
+
+  def copy(self):
+    copy = Module(self.name, self.path, self.symbol_table)
+    copy.set_position(self.start, self.end)
+    copy.set_context(self.context)
+    return copy
+
+  def __repr__(self):
+    return f'<module {self.name}>'
+
+class Task(Value):
+  def __init__(self, name, result=None, future=None):
+    super().__init__()
+    self.name = name
+    self.result = result
+    self.future = future
+
+  def is_true(self):
+    return True
+
+  def copy(self):
+    copy = Task(self.name, self.result, self.future)
+    copy.set_position(self.start, self.end)
+    copy.set_context(self.context)
+    return copy
+
+  def __repr__(self):
+    return f'<task {self.name}>'
+
+def values_equal(left, right):
+  if left is right:
+    return True
+  if isinstance(left, Number) and isinstance(right, Number):
+    return left.value == right.value
+  if isinstance(left, String) and isinstance(right, String):
+    return left.equals(right)
+  if isinstance(left, List) and isinstance(right, List):
+    if left.elements is right.elements: return True
+    if len(left.elements) != len(right.elements): return False
+    return all(values_equal(a, b) for a, b in zip(left.elements, right.elements))
+  if isinstance(left, Record) and isinstance(right, Record):
+    if left.layout is not right.layout: return False
+    return all(values_equal(a, b) for a, b in zip(left.fields, right.fields))
+  if isinstance(left, Map) and isinstance(right, Map):
+    if left.entries is right.entries: return True
+    if left.entries.keys() != right.entries.keys(): return False
+    return all(values_equal(value, right.entries[key][1]) for key, (_, value) in left.entries.items())
+  return False
\ No newline at end of file
@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+from context import Environment
+from interpreter import run, global_symbol_table
+import time
+
+class RunResult:
+  def __init__(self, fn, value, error, elapsed, stats=None):
+    self.fn = fn
+    self.value = value
+    self.error = error
+    self.elapsed = elapsed
+    self.stats = stats
+
+  def __repr__(self):
+    status = 'error' if self.error else 'ok'
+    return f'<run {self.fn} {status} in {self.elapsed * 1000:.3f}ms>'
+
+class Engine:
+  # Every run gets its own Environment over the engine's base table, so
+  # runs share nothing mutable and can be executed from any thread.
+  def __init__(self, max_workers=None, base=None, limits=None):
+    self.base = base if base is not None else global_symbol_table
+    self.limits = limits
+    self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ozen')
+
+  def new_environment(self):
+    return Environment(self.base)
+
+  def run(self, source, fn='<engine>', environment=None, limits=None, output=None, hooks=None, stats=None):
+    owned = environment is None
+    if owned:
+      environment = self.new_environment()
+    if limits is None:
+      limits = self.limits
+
+    start = time.perf_counter()
+    try:
+      value, error = run(fn, source, environment, limits, output, hooks, stats)
+    finally:
+      if owned: environment.release()
+    return RunResult(fn, value, error, time.perf_counter() - start, stats)
+
+  def submit(self, source, fn='<engine>', environment=None, limits=None, output=None, hooks=None, stats=None):
+    return self.executor.submit(self.run, source, fn, environment, limits, output, hooks, stats)
+
+  def map(self, sources, fn='<engine>'):
+    return [future.result() for future in [self.submit(source, fn) for source in sources]]
+
+  def shutdown(self, wait=True):
+    self.executor.shutdown(wait=wait)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.shutdown()
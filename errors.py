@@ -25,6 +25,13 @@ class InvalidSyntaxError(Error):
   def __init__(self, start, end, details=''):
     super().__init__(start, end, 'Invalid Syntax', details)
 
+class IterationError(Exception):
+  # Raised out of a value's iterator to stop a for-in loop with a runtime
+  # error (e.g. one raised inside a generator body).
+  def __init__(self, error):
+    super().__init__(error.details)
+    self.error = error
+
 class RunTimeError(Error):
   def __init__(self, start, end, details, context):
     super().__init__(start, end, 'Runtime Error', details)
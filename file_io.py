@@ -0,0 +1,162 @@
+from datatype import Value, Number, String
+from errors import RunTimeError, IterationError
+import mmap
+import os
+import sys
+
+FILE_MODES = ('r', 'w', 'a')
+MMAP_THRESHOLD = 1 << 24
+CHUNK_SIZE = 1 << 24
+MIN_CHUNK_SIZE = 1 << 12
+NUMBER_SIZE = 8
+SEPARATORS = (b'\n', b' ', b'\t', b'\r')
+
+class File(Value):
+  # An open file handle. Reads go through Python's buffered reader one line
+  # at a time, so a file is never loaded whole just to walk its lines.
+  def __init__(self, path, mode, handle):
+    super().__init__()
+    self.path = path
+    self.mode = mode
+    self.handle = handle
+
+  @staticmethod
+  def open(path, mode):
+    return File(path, mode, open(path, mode, encoding='utf-8'))
+
+  @property
+  def closed(self):
+    return self.handle.closed
+
+  def read_line(self, limit=None):
+    # Reads at most one character past limit, enough for the caller's
+    # quota check to fail without the rest of an endless line in memory.
+    line = self.handle.readline(limit + 1 if limit is not None else -1)
+    if not line: return None
+    return line[:-1] if line.endswith('\n') else line
+
+  def lines(self):
+    # A failed read (the loop body closed the file, bytes that are not
+    # UTF-8, an I/O error) stops the loop with the error read_line reports.
+    while True:
+      try:
+        line = next(self.handle)
+      except StopIteration:
+        return
+      except (OSError, ValueError) as e:
+        raise IterationError(RunTimeError(
+          self.start, self.end,
+          f"Failed to read \"{self.path}\"\n" + str(e),
+          self.context
+        ))
+      yield String(line[:-1] if line.endswith('\n') else line)
+
+  def iterate(self):
+    if self.closed or self.mode != 'r': return None
+    return self.lines()
+
+  def write(self, text):
+    self.handle.write(text)
+
+  def close(self):
+    self.handle.close()
+
+  def is_true(self):
+    return not self.closed
+
+  def copy(self):
+    copy = File(self.path, self.mode, self.handle)
+    copy.set_position(self.start, self.end)
+    copy.set_context(self.context)
+    return copy
+
+  def __repr__(self):
+    state = 'closed' if self.closed else self.mode
+    return f'<file "{self.path}" {state}>'
+
+###################################
+
+def parse_number(token):
+  try:
+    return int(token)
+  except ValueError:
+    return float(token)
+
+def parse_numbers(data):
+  # Whitespace separated numbers; the all-integer case is one map() call.
+  tokens = data.split()
+  try:
+    return [Number(value) for value in map(int, tokens)]
+  except ValueError:
+    return [Number(parse_number(token)) for token in tokens]
+
+def chunk_end(memory, start, end):
+  # Move a chunk boundary back to the last separator so no number is cut.
+  if end >= len(memory): return len(memory)
+  for separator in (b'\n', b' ', b'\t'):
+    cut = memory.rfind(separator, start, end)
+    if cut > start: return cut
+  cut = memory.find(b'\n', end)
+  return cut if cut != -1 else len(memory)
+
+class ReadLimit(Exception):
+  # Raised by read_numbers once the values, or the text of a single
+  # number, would take more than the bytes it was allowed.
+  pass
+
+def check_limit(values, pending, limit):
+  # pending is the length of the text not yet parsed.
+  if limit is not None and max(len(values) * NUMBER_SIZE, pending) > limit:
+    raise ReadLimit()
+
+def chunk_size(limit):
+  # With a byte limit, chunks are no bigger than the limit, so the data
+  # held at once stays in proportion to what the values may take.
+  if limit is None: return CHUNK_SIZE
+  return max(MIN_CHUNK_SIZE, min(CHUNK_SIZE, limit))
+
+def read_stream(stream, limit):
+  # Reads in chunks, carrying a number cut by a chunk boundary over to the
+  # next one.
+  size = chunk_size(limit)
+  values = []
+  rest = b''
+  while True:
+    data = stream.read(size)
+    if not data: break
+    data = rest + data
+    cut = max(data.rfind(separator) for separator in SEPARATORS)
+    if cut == -1:
+      rest = data
+    else:
+      values.extend(parse_numbers(data[:cut]))
+      rest = data[cut:]
+    check_limit(values, len(rest), limit)
+  values.extend(parse_numbers(rest))
+  check_limit(values, 0, limit)
+  return values
+
+def read_numbers(path, limit=None):
+  # limit is the bytes the values may take (NUMBER_SIZE each). Reading
+  # stops with ReadLimit soon after it is passed, without the whole file
+  # in memory.
+  if path == '-':
+    return read_stream(sys.stdin.buffer, limit)
+
+  with open(path, 'rb') as f:
+    size = os.fstat(f.fileno()).st_size
+    if size < MMAP_THRESHOLD:
+      if limit is None: return parse_numbers(f.read())
+      return read_stream(f, limit)
+
+    values = []
+    step = chunk_size(limit)
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as memory:
+      start = 0
+      while start < size:
+        end = chunk_end(memory, start, start + step)
+        check_limit(values, end - start, limit)
+        values.extend(parse_numbers(memory[start:end]))
+        check_limit(values, 0, limit)
+        start = end
+    return values
@@ -0,0 +1,168 @@
+from runtime import RunTimeResult
+from datatype import Value, Number
+from errors import RunTimeError, IterationError
+from async_engine import AsyncInterpreter
+import inspect
+
+class Suspend:
+  # What a yield awaits. Its bare yield passes this object up through every
+  # coroutine frame of the generator body to the send() that resumed it.
+  __slots__ = ('value',)
+
+  def __init__(self, value):
+    self.value = value
+
+  def __await__(self):
+    yield self
+
+class GeneratorInterpreter(AsyncInterpreter):
+  # Evaluates a generator body with the coroutine visitors so a yield can
+  # suspend it mid-statement. Only the body's own frames are coroutines:
+  # anything it calls runs on the ordinary interpreter, and it never needs
+  # an event loop.
+  def __init__(self):
+    super().__init__()
+
+  async def back_edge(self, node, context):
+    return self.check_step(node, context) if context.quota else None
+
+  async def call(self, value_to_call, args):
+    return value_to_call.execute(args)
+
+  async def visit_YieldNode(self, node, context):
+    res = RunTimeResult()
+
+    if node.node_to_yield:
+      value = res.register(await self.visit(node.node_to_yield, context))
+      if res.should_return(): return res
+    else:
+      value = Number.null
+
+    await Suspend(value)
+    return res.success(Number.null)
+
+  def suspend(self):
+    pass
+
+  def resume(self):
+    pass
+
+class HookedGeneratorInterpreter(GeneratorInterpreter):
+  # Takes the place of GeneratorInterpreter when the run has hooks, like
+  # HookedInterpreter does for Interpreter. Hooks expect nodes to nest, so
+  # when the body yields, the nodes it still has open are exited (with
+  # result None) and they are entered again when it resumes; an abandoned
+  # body reports nothing while it is closed.
+  def __init__(self, hooks):
+    super().__init__()
+    self.hooks = hooks
+    self.open = []        # (node, context) entered and not yet exited
+    self.suspended = False
+
+  async def visit(self, node, context):
+    method = getattr(self, f'visit_{type(node).__name__}', self.no_visit_method)
+    self.hooks.node_enter(node, context)
+    self.open.append((node, context))
+    result = None
+    try:
+      result = method(node, context)
+      if inspect.isawaitable(result):
+        result = await result
+      return result
+    finally:
+      self.open.pop()
+      if not self.suspended: self.hooks.node_exit(node, context, result)
+
+  def suspend(self):
+    self.suspended = True
+    for node, context in reversed(self.open):
+      self.hooks.node_exit(node, context, None)
+
+  def resume(self):
+    self.suspended = False
+    for node, context in self.open:
+      self.hooks.node_enter(node, context)
+
+class GeneratorFrame:
+  # The suspended body, shared by every copy of a generator value. The
+  # coroutine is only created on the first resume, so a generator that is
+  # never consumed costs nothing. running is set while the body runs, so
+  # a body that resumes its own generator gets an error instead of a
+  # re-entered coroutine.
+  __slots__ = ('body_node', 'exec_ctx', 'interpreter', 'coroutine', 'done', 'running')
+
+  def __init__(self, body_node, exec_ctx):
+    self.body_node = body_node
+    self.exec_ctx = exec_ctx
+    self.interpreter = None
+    self.coroutine = None
+    self.done = False
+    self.running = False
+
+  def send(self):
+    if self.coroutine is None:
+      hooks = self.exec_ctx.hooks
+      self.interpreter = HookedGeneratorInterpreter(hooks) if hooks else GeneratorInterpreter()
+      self.coroutine = self.interpreter.visit(self.body_node, self.exec_ctx)
+    self.running = True
+    try:
+      self.interpreter.resume()
+      suspend = self.coroutine.send(None)
+      self.interpreter.suspend()
+      return suspend
+    except BaseException:
+      self.done = True
+      raise
+    finally:
+      self.running = False
+
+class Generator(Value):
+  def __init__(self, name, frame):
+    super().__init__()
+    self.name = name
+    self.frame = frame
+
+  @staticmethod
+  def start(function, exec_ctx):
+    return Generator(function.name, GeneratorFrame(function.body_node, exec_ctx))
+
+  def resume(self):
+    # Runs the body up to its next yield: (value, error), with value None
+    # once the body has finished.
+    frame = self.frame
+    if frame.done: return None, None
+    if frame.running:
+      return None, RunTimeError(
+        self.start, self.end,
+        f"Generator {self.name} is already running",
+        self.context
+      )
+
+    try:
+      suspend = frame.send()
+    except StopIteration as stop:
+      return None, stop.value.error
+
+    return suspend.value, None
+
+  def values(self):
+    while True:
+      value, error = self.resume()
+      if error: raise IterationError(error)
+      if value is None: return
+      yield value
+
+  def iterate(self):
+    return self.values()
+
+  def is_true(self):
+    return not self.frame.done
+
+  def copy(self):
+    copy = Generator(self.name, self.frame)
+    copy.set_position(self.start, self.end)
+    copy.set_context(self.context)
+    return copy
+
+  def __repr__(self):
+    return f'<generator {self.name}>'
@@ -0,0 +1,71 @@
+class Hook:
+  # Base class for run hooks: every event is a no-op, override the ones
+  # you need and pass instances to run(..., hooks=[...]). Events:
+  #   run_start(context) / run_end(context, result)
+  #     around a whole program, including nested run() and import()
+  #   node_enter(node, context) / node_exit(node, context, result)
+  #     around every node evaluated; result is None if Python raised, or
+  #     if a generator body yielded inside the node (it is entered again
+  #     when the generator resumes)
+  #   function_call(function, args, context) / function_return(function, result, context)
+  #     around every ozen and builtin call; context is the callee's
+  #   error(error, context)
+  #     once per runtime error, when the node that produced it exits
+  def run_start(self, context):
+    pass
+
+  def run_end(self, context, result):
+    pass
+
+  def node_enter(self, node, context):
+    pass
+
+  def node_exit(self, node, context, result):
+    pass
+
+  def function_call(self, function, args, context):
+    pass
+
+  def function_return(self, function, result, context):
+    pass
+
+  def error(self, error, context):
+    pass
+
+class RunHooks:
+  # The hooks of one run, shared by every context in it. Fans each event
+  # out in registration order. An error travels up through every node
+  # above the one that raised it, so only its first exit is reported.
+  __slots__ = ('hooks', 'last_error')
+
+  def __init__(self, hooks):
+    self.hooks = tuple(hooks)
+    self.last_error = None
+
+  def run_start(self, context):
+    for hook in self.hooks: hook.run_start(context)
+
+  def run_end(self, context, result):
+    for hook in self.hooks: hook.run_end(context, result)
+
+  def node_enter(self, node, context):
+    for hook in self.hooks: hook.node_enter(node, context)
+
+  def node_exit(self, node, context, result):
+    error = result.error if result is not None else None
+    if error is not None and error is not self.last_error:
+      self.last_error = error
+      for hook in self.hooks: hook.error(error, context)
+    for hook in self.hooks: hook.node_exit(node, context, result)
+
+  def function_call(self, function, args, context):
+    for hook in self.hooks: hook.function_call(function, args, context)
+
+  def function_return(self, function, result, context):
+    for hook in self.hooks: hook.function_return(function, result, context)
+
+def run_hooks(hooks):
+  # What a run keeps on its contexts: None without hooks, so the plain
+  # interpreter is used. Nested runs pass their parent's RunHooks through.
+  if not hooks: return None
+  return hooks if isinstance(hooks, RunHooks) else RunHooks(hooks)
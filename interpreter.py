@@ -4,6 +4,15 @@ from errors import *
 from tokens import *
 from context import *
 import os
+import sys
+import time
+from shared_buffer import NumericBuffer, TYPECODES
+from file_io import File, FILE_MODES, ReadLimit, read_numbers
+from quota import Quota, estimate_size
+from output import OutputSink
+from hooks import run_hooks
+from metrics import RunStats
+import metrics
 from lexical_analysis import LexicalAnalyzer
 from syntax_analysis import Parser
 
@@ -16,6 +25,16 @@ class Interpreter:
   def no_visit_method(self, node, context):
     raise Exception(f'No visit_{type(node).__name__} method defined')
 
+  def check_step(self, node, context):
+    message = context.quota.step()
+    if message: return RunTimeError(node.start, node.end, message, context)
+    return None
+
+  def check_allocation(self, node, left, right, context):
+    message = context.quota.allocate(estimate_size(node.op_tkn.type, left, right))
+    if message: return RunTimeError(node.start, node.end, message, context)
+    return None
+
   ###################################
 
   def visit_NumberNode(self, node, context):
@@ -40,10 +59,25 @@ class Interpreter:
       List(elements).set_context(context).set_position(node.start, node.end)
     )
 
+  def visit_MapNode(self, node, context):
+    res = RunTimeResult()
+    map_ = Map({}).set_context(context).set_position(node.start, node.end)
+
+    for key_node, value_node in node.pair_nodes:
+      key = res.register(self.visit(key_node, context))
+      if res.should_return(): return res
+      value = res.register(self.visit(value_node, context))
+      if res.should_return(): return res
+
+      _, error = map_.set(key, value)
+      if error: return res.failure(error)
+
+    return res.success(map_)
+
   def visit_VarAccessNode(self, node, context):
     res = RunTimeResult()
     var_name = node.var_name_tkn.value
-    value = context.symbol_table.get(var_name)
+    value = context.symbol_table.lookup(var_name, node)
 
     if not value:
       return res.failure(RunTimeError(
@@ -71,6 +105,14 @@ class Interpreter:
     right = res.register(self.visit(node.right_node, context))
     if res.should_return(): return res
 
+    if context.quota:
+      error = self.check_allocation(node, left, right, context)
+      if error: return res.failure(error)
+    return self.binary_operation(node, left, right)
+
+  def binary_operation(self, node, left, right):
+    res = RunTimeResult()
+
     if node.op_tkn.type == TKN_PLUS:
       result, error = left.addition(right)
     elif node.op_tkn.type == TKN_MINUS:
@@ -109,7 +151,10 @@ class Interpreter:
     res = RunTimeResult()
     number = res.register(self.visit(node.node, context))
     if res.should_return(): return res
+    return self.unary_operation(node, number)
 
+  def unary_operation(self, node, number):
+    res = RunTimeResult()
     error = None
 
     if node.op_tkn.type == TKN_MINUS:
@@ -166,6 +211,11 @@ class Interpreter:
       condition = lambda: i > end_value.value
     
     while condition():
+      if context.quota:
+        error = self.check_step(node, context)
+        if error: return res.failure(error)
+      if context.stats: context.stats.iterations += 1
+
       context.symbol_table.set(node.var_name_tkn.value, Number(i))
       i += step_value.value
 
@@ -185,6 +235,48 @@ class Interpreter:
       List(elements).set_context(context).set_position(node.start, node.end)
     )
 
+  def visit_ForInNode(self, node, context):
+    res = RunTimeResult()
+    elements = []
+
+    iterable = res.register(self.visit(node.iterable_node, context))
+    if res.should_return(): return res
+
+    iterator = iterable.iterate()
+    if iterator == None:
+      return res.failure(RunTimeError(
+        node.iterable_node.start, node.iterable_node.end,
+        "Value is not iterable",
+        context
+      ))
+
+    try:
+      for element in iterator:
+        if context.quota:
+          error = self.check_step(node, context)
+          if error: return res.failure(error)
+        if context.stats: context.stats.iterations += 1
+
+        context.symbol_table.set(node.var_name_tkn.value, element)
+
+        value = res.register(self.visit(node.body_node, context))
+        if res.should_return() and res.loop_continue == False and res.loop_break == False: return res
+
+        if res.loop_continue:
+          continue
+
+        if res.loop_break:
+          break
+
+        elements.append(value)
+    except IterationError as e:
+      return res.failure(e.error)
+
+    return res.success(
+      Number.null if node.should_return_null else
+      List(elements).set_context(context).set_position(node.start, node.end)
+    )
+
   def visit_WhileNode(self, node, context):
     res = RunTimeResult()
     elements = []
@@ -196,6 +288,11 @@ class Interpreter:
       if not condition.is_true():
         break
 
+      if context.quota:
+        error = self.check_step(node, context)
+        if error: return res.failure(error)
+      if context.stats: context.stats.iterations += 1
+
       value = res.register(self.visit(node.body_node, context))
       if res.should_return() and res.loop_continue == False and res.loop_break == False: return res
 
@@ -218,13 +315,66 @@ class Interpreter:
     func_name = node.var_name_tkn.value if node.var_name_tkn else None
     body_node = node.body_node
     arg_names = [arg_name.value for arg_name in node.arg_name_tkns]
-    func_value = Function(func_name, body_node, arg_names, node.should_auto_return).set_context(context).set_position(node.start, node.end)
+    func_value = Function(func_name, body_node, arg_names, node.should_auto_return, node.is_generator).set_context(context).set_position(node.start, node.end)
     
     if node.var_name_tkn:
       context.symbol_table.set(func_name, func_value)
 
     return res.success(func_value)
 
+  def visit_RecordDefNode(self, node, context):
+    res = RunTimeResult()
+
+    record_name = node.var_name_tkn.value
+    field_names = [field_name.value for field_name in node.field_name_tkns]
+    record_type = RecordType(RecordLayout.get(record_name, field_names)).set_context(context).set_position(node.start, node.end)
+    context.symbol_table.set(record_name, record_type)
+
+    return res.success(record_type)
+
+  def visit_FieldAccessNode(self, node, context):
+    res = RunTimeResult()
+    record = res.register(self.visit(node.node, context))
+    if res.should_return(): return res
+    return self.field_access(node, record, context)
+
+  def field_access(self, node, record, context):
+    res = RunTimeResult()
+
+    if isinstance(record, Module):
+      value = record.member(node.field_name_tkn.value)
+      if value == None:
+        return res.failure(RunTimeError(
+          node.field_name_tkn.start, node.field_name_tkn.end,
+          f"Module '{record.name}' has no member '{node.field_name_tkn.value}'",
+          context
+        ))
+      # Members resolve names in the module but run under the caller's
+      # limits, output, hooks and stats.
+      module_ctx = context.rebind(record.symbol_table)
+      return res.success(value.copy().set_position(node.start, node.end).set_context(module_ctx))
+
+    if not isinstance(record, Record):
+      return res.failure(RunTimeError(
+        node.start, node.end,
+        f"Cannot read field '{node.field_name_tkn.value}' of a non-record value",
+        context
+      ))
+
+    field_cache = node.field_cache
+    if field_cache is None or field_cache[0] is not record.layout:
+      offset = record.layout.offsets.get(node.field_name_tkn.value, None)
+      if offset is None:
+        return res.failure(RunTimeError(
+          node.field_name_tkn.start, node.field_name_tkn.end,
+          f"'{record.layout.name}' has no field '{node.field_name_tkn.value}'",
+          context
+        ))
+      field_cache = node.field_cache = (record.layout, offset)
+
+    value = record.fields[field_cache[1]]
+    return res.success(value.copy().set_position(node.start, node.end).set_context(context))
+
   def visit_CallNode(self, node, context):
     res = RunTimeResult()
     args = []
@@ -259,12 +409,42 @@ class Interpreter:
   def visit_BreakNode(self, node, context):
     return RunTimeResult().success_break()
 
-  
+class HookedInterpreter(Interpreter):
+  # Takes the place of Interpreter for runs with hooks, so the plain
+  # dispatch never checks for them. Every visit_* method recurses through
+  # self.visit, which keeps a whole call body on this dispatch.
+  def __init__(self, hooks):
+    self.hooks = hooks
+
+  def visit(self, node, context):
+    method = getattr(self, f'visit_{type(node).__name__}', self.no_visit_method)
+    self.hooks.node_enter(node, context)
+    result = None
+    try:
+      result = method(node, context)
+      return result
+    finally:
+      self.hooks.node_exit(node, context, result)
+
 class BaseFunction(Value):
   def __init__(self, name):
     super().__init__()
     self.name = name or "<anonymous>"
 
+  def execute(self, args):
+    exec_ctx = self.generate_new_context()
+    if exec_ctx.stats: exec_ctx.stats.call(exec_ctx.depth)
+    hooks = exec_ctx.hooks
+    if not hooks: return self.run(args, exec_ctx)
+
+    hooks.function_call(self, args, exec_ctx)
+    result = None
+    try:
+      result = self.run(args, exec_ctx)
+      return result
+    finally:
+      hooks.function_return(self, result, exec_ctx)
+
   def generate_new_context(self):
     new_context = Context(self.name, self.context, self.start)
     new_context.symbol_table = SymbolTable(new_context.parent.symbol_table)
@@ -292,7 +472,7 @@ class BaseFunction(Value):
   def populate_args(self, arg_names, args, exec_ctx):
     for i in range(len(args)):
       arg_name = arg_names[i]
-      arg_value = args[i]
+      arg_value = args[i].copy()
       arg_value.set_context(exec_ctx)
       exec_ctx.symbol_table.set(arg_name, arg_value)
 
@@ -304,20 +484,30 @@ class BaseFunction(Value):
     return res.success(None)
 
 class Function(BaseFunction):
-  def __init__(self, name, body_node, arg_names, should_auto_return):
+  def __init__(self, name, body_node, arg_names, should_auto_return, is_generator=False):
     super().__init__(name)
     self.body_node = body_node
     self.arg_names = arg_names
     self.should_auto_return = should_auto_return
+    self.is_generator = is_generator
 
-  def execute(self, args):
+  def run(self, args, exec_ctx):
     res = RunTimeResult()
-    interpreter = Interpreter()
-    exec_ctx = self.generate_new_context()
+    interpreter = HookedInterpreter(exec_ctx.hooks) if exec_ctx.hooks else Interpreter()
+
+    if exec_ctx.quota:
+      message = exec_ctx.quota.enter(exec_ctx.depth)
+      if message: return res.failure(RunTimeError(self.start, self.end, message, exec_ctx))
 
     res.register(self.check_and_populate_args(self.arg_names, args, exec_ctx))
     if res.should_return(): return res
 
+    if self.is_generator:
+      # Imported here: generators builds on the async interpreter, which
+      # imports this module.
+      from generators import Generator
+      return res.success(Generator.start(self, exec_ctx))
+
     value = res.register(interpreter.visit(self.body_node, exec_ctx))
     if res.should_return() and res.func_return_value == None: return res
 
@@ -325,7 +515,7 @@ class Function(BaseFunction):
     return res.success(ret_value)
 
   def copy(self):
-    copy = Function(self.name, self.body_node, self.arg_names, self.should_auto_return)
+    copy = Function(self.name, self.body_node, self.arg_names, self.should_auto_return, self.is_generator)
     copy.set_context(self.context)
     copy.set_position(self.start, self.end)
     return copy
@@ -333,13 +523,34 @@ class Function(BaseFunction):
   def __repr__(self):
     return f"<function {self.name}>"
 
+class RecordType(BaseFunction):
+  def __init__(self, layout):
+    super().__init__(layout.name)
+    self.layout = layout
+
+  def execute(self, args):
+    res = RunTimeResult()
+
+    res.register(self.check_args(self.layout.field_names, args))
+    if res.should_return(): return res
+
+    return res.success(Record(self.layout, tuple(args)))
+
+  def copy(self):
+    copy = RecordType(self.layout)
+    copy.set_context(self.context)
+    copy.set_position(self.start, self.end)
+    return copy
+
+  def __repr__(self):
+    return f"<record {self.name}>"
+
 class BuiltInFunction(BaseFunction):
   def __init__(self, name):
     super().__init__(name)
 
-  def execute(self, args):
+  def run(self, args, exec_ctx):
     res = RunTimeResult()
-    exec_ctx = self.generate_new_context()
 
     method_name = f'execute_{self.name}'
     method = getattr(self, method_name, self.no_visit_method)
@@ -354,6 +565,29 @@ class BuiltInFunction(BaseFunction):
   def no_visit_method(self, node, context):
     raise Exception(f'No execute_{self.name} method defined')
 
+  def write_output(self, text, exec_ctx):
+    if exec_ctx.output: exec_ctx.output.write(text)
+    else: sys.stdout.write(text)
+
+  def flush_output(self, exec_ctx):
+    if exec_ctx.output: exec_ctx.output.flush()
+
+  def program_table(self, exec_ctx):
+    # The global table of the program the call was made from.
+    program_ctx = exec_ctx
+    while program_ctx.parent:
+      program_ctx = program_ctx.parent
+    return program_ctx.symbol_table
+
+  def byte_budget(self, exec_ctx):
+    return exec_ctx.quota.bytes_left() if exec_ctx.quota else None
+
+  def allocate(self, size, exec_ctx):
+    if not exec_ctx.quota: return None
+    message = exec_ctx.quota.allocate(size)
+    if message: return RunTimeError(self.start, self.end, message, exec_ctx)
+    return None
+
   def copy(self):
     copy = BuiltInFunction(self.name)
     copy.set_context(self.context)
@@ -366,7 +600,7 @@ class BuiltInFunction(BaseFunction):
   #####################################
 
   def execute_print(self, exec_ctx):
-    print(str(exec_ctx.symbol_table.get('value')))
+    self.write_output(str(exec_ctx.symbol_table.get('value')) + '\n', exec_ctx)
     return RunTimeResult().success(Number.null)
   execute_print.arg_names = ['value']
   
@@ -375,22 +609,25 @@ class BuiltInFunction(BaseFunction):
   execute_print_ret.arg_names = ['value']
   
   def execute_input(self, exec_ctx):
+    self.flush_output(exec_ctx)
     text = input()
     return RunTimeResult().success(String(text))
   execute_input.arg_names = []
 
   def execute_input_int(self, exec_ctx):
     while True:
+      self.flush_output(exec_ctx)
       text = input()
       try:
         number = int(text)
         break
       except ValueError:
-        print(f"'{text}' must be an integer. Try again!")
+        self.write_output(f"'{text}' must be an integer. Try again!\n", exec_ctx)
     return RunTimeResult().success(Number(number))
   execute_input_int.arg_names = []
 
   def execute_clear(self, exec_ctx):
+    self.flush_output(exec_ctx)
     os.system('cls' if os.name == 'nt' else 'cls') 
     return RunTimeResult().success(Number.null)
   execute_clear.arg_names = []
@@ -415,10 +652,26 @@ class BuiltInFunction(BaseFunction):
     return RunTimeResult().success(Number.true if is_number else Number.false)
   execute_is_function.arg_names = ["value"]
 
+  def execute_is_record(self, exec_ctx):
+    is_record = isinstance(exec_ctx.symbol_table.get("value"), Record)
+    return RunTimeResult().success(Number.true if is_record else Number.false)
+  execute_is_record.arg_names = ["value"]
+
+  def execute_is_map(self, exec_ctx):
+    is_map = isinstance(exec_ctx.symbol_table.get("value"), Map)
+    return RunTimeResult().success(Number.true if is_map else Number.false)
+  execute_is_map.arg_names = ["value"]
+
   def execute_append(self, exec_ctx):
     list_ = exec_ctx.symbol_table.get("list")
     value = exec_ctx.symbol_table.get("value")
 
+    if isinstance(list_, StringBuilder):
+      error = self.allocate(len(str(value)), exec_ctx)
+      if error: return RunTimeResult().failure(error)
+      list_.append(value)
+      return RunTimeResult().success(Number.null)
+
     if not isinstance(list_, List):
       return RunTimeResult().failure(RunTimeError(
         self.start, self.end,
@@ -426,6 +679,8 @@ class BuiltInFunction(BaseFunction):
         exec_ctx
       ))
 
+    error = self.allocate(8, exec_ctx)
+    if error: return RunTimeResult().failure(error)
     list_.elements.append(value)
     return RunTimeResult().success(Number.null)
   execute_append.arg_names = ["list", "value"]
@@ -477,6 +732,8 @@ class BuiltInFunction(BaseFunction):
         exec_ctx
       ))
 
+    error = self.allocate(len(listB.elements) * 8, exec_ctx)
+    if error: return RunTimeResult().failure(error)
     listA.elements.extend(listB.elements)
     return RunTimeResult().success(Number.null)
   execute_extend.arg_names = ["listA", "listB"]
@@ -484,6 +741,15 @@ class BuiltInFunction(BaseFunction):
   def execute_len(self, exec_ctx):
     list_ = exec_ctx.symbol_table.get("list")
 
+    if isinstance(list_, Map):
+      return RunTimeResult().success(Number(len(list_.entries)))
+
+    if isinstance(list_, NumericBuffer):
+      return RunTimeResult().success(Number(list_.length))
+
+    if isinstance(list_, Range):
+      return RunTimeResult().success(Number(len(list_.range)))
+
     if not isinstance(list_, List):
       return RunTimeResult().failure(RunTimeError(
         self.start, self.end,
@@ -494,12 +760,74 @@ class BuiltInFunction(BaseFunction):
     return RunTimeResult().success(Number(len(list_.elements)))
   execute_len.arg_names = ["list"]
 
+  def check_map(self, map_, exec_ctx):
+    if not isinstance(map_, Map):
+      return RunTimeError(
+        self.start, self.end,
+        "First argument must be map",
+        exec_ctx
+      )
+    return None
+
+  def execute_get(self, exec_ctx):
+    map_ = exec_ctx.symbol_table.get("map")
+    error = self.check_map(map_, exec_ctx)
+    if error: return RunTimeResult().failure(error)
+
+    value, error = map_.get(exec_ctx.symbol_table.get("key"))
+    if error: return RunTimeResult().failure(error)
+    return RunTimeResult().success(value)
+  execute_get.arg_names = ["map", "key"]
+
+  def execute_set(self, exec_ctx):
+    map_ = exec_ctx.symbol_table.get("map")
+    error = self.check_map(map_, exec_ctx)
+    if error: return RunTimeResult().failure(error)
+
+    _, error = map_.set(exec_ctx.symbol_table.get("key"), exec_ctx.symbol_table.get("value"))
+    if error: return RunTimeResult().failure(error)
+    return RunTimeResult().success(Number.null)
+  execute_set.arg_names = ["map", "key", "value"]
+
+  def execute_has(self, exec_ctx):
+    map_ = exec_ctx.symbol_table.get("map")
+    error = self.check_map(map_, exec_ctx)
+    if error: return RunTimeResult().failure(error)
+
+    has_key = map_.has(exec_ctx.symbol_table.get("key"))
+    return RunTimeResult().success(Number.true if has_key else Number.false)
+  execute_has.arg_names = ["map", "key"]
+
+  def execute_delete(self, exec_ctx):
+    map_ = exec_ctx.symbol_table.get("map")
+    error = self.check_map(map_, exec_ctx)
+    if error: return RunTimeResult().failure(error)
+
+    value, error = map_.delete(exec_ctx.symbol_table.get("key"))
+    if error: return RunTimeResult().failure(error)
+    return RunTimeResult().success(value)
+  execute_delete.arg_names = ["map", "key"]
+
+  def execute_keys(self, exec_ctx):
+    map_ = exec_ctx.symbol_table.get("map")
+    error = self.check_map(map_, exec_ctx)
+    if error: return RunTimeResult().failure(error)
+    return RunTimeResult().success(List(map_.keys()))
+  execute_keys.arg_names = ["map"]
+
+  def execute_values(self, exec_ctx):
+    map_ = exec_ctx.symbol_table.get("map")
+    error = self.check_map(map_, exec_ctx)
+    if error: return RunTimeResult().failure(error)
+    return RunTimeResult().success(List(map_.values()))
+  execute_values.arg_names = ["map"]
+
   def execute_to_int(self, exec_ctx):
     num = exec_ctx.symbol_table.get("value")
     try:
       final_num = int(num.value)
     except ValueError:
-      print("Cannot convert to int")
+      self.write_output("Cannot convert to int\n", exec_ctx)
     return RunTimeResult().success(Number(final_num))
   execute_to_int.arg_names = ["value"]
 
@@ -508,19 +836,539 @@ class BuiltInFunction(BaseFunction):
     try:
       final_num = float(num.value)
     except ValueError:
-      print("Cannot convert to float")
+      self.write_output("Cannot convert to float\n", exec_ctx)
     return RunTimeResult().success(Number(final_num))
   execute_to_float.arg_names = ["value"]
 
   def execute_to_string(self, exec_ctx):
     string_sample = exec_ctx.symbol_table.get("value")
+    if isinstance(string_sample, StringBuilder):
+      return RunTimeResult().success(String(string_sample.build()))
     try:
       final_string = str(string_sample.value)
     except ValueError:
-      print("Cannot convert to string")
+      self.write_output("Cannot convert to string\n", exec_ctx)
     return RunTimeResult().success(String(final_string))
   execute_to_string.arg_names = ["value"]
 
+  def execute_sleep(self, exec_ctx):
+    seconds = exec_ctx.symbol_table.get("seconds")
+
+    if not isinstance(seconds, Number):
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Argument must be a number",
+        exec_ctx
+      ))
+
+    remaining = exec_ctx.quota.remaining() if exec_ctx.quota else None
+    if remaining is not None and seconds.value > remaining:
+      time.sleep(remaining)
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        f"Time limit of {exec_ctx.quota.limits.max_seconds}s exceeded",
+        exec_ctx
+      ))
+
+    time.sleep(max(seconds.value, 0))
+    return RunTimeResult().success(Number.null)
+  execute_sleep.arg_names = ["seconds"]
+
+  def execute_spawn(self, exec_ctx):
+    func = exec_ctx.symbol_table.get("func")
+
+    if not isinstance(func, BaseFunction):
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Argument must be a function",
+        exec_ctx
+      ))
+
+    return RunTimeResult().success(Task(func.name, result=func.execute([])))
+  execute_spawn.arg_names = ["func"]
+
+  def execute_wait(self, exec_ctx):
+    task = exec_ctx.symbol_table.get("task")
+
+    if not isinstance(task, Task) or task.result == None:
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Argument must be a task",
+        exec_ctx
+      ))
+
+    if task.result.error: return RunTimeResult().failure(task.result.error)
+    return RunTimeResult().success(task.result.value)
+  execute_wait.arg_names = ["task"]
+
+  def check_function_and_list(self, exec_ctx):
+    if not isinstance(exec_ctx.symbol_table.get("func"), BaseFunction):
+      return RunTimeError(
+        self.start, self.end,
+        "First argument must be a function",
+        exec_ctx
+      )
+
+    if not isinstance(exec_ctx.symbol_table.get("list"), List):
+      return RunTimeError(
+        self.start, self.end,
+        "Second argument must be list",
+        exec_ctx
+      )
+    return None
+
+  def captured_globals(self, exec_ctx):
+    tables = []
+    table = exec_ctx.symbol_table.parent
+    while table and table is not global_symbol_table:
+      tables.append(table)
+      table = table.parent
+
+    captured = {}
+    for table in reversed(tables):
+      captured.update(table.symbols)
+    return captured
+
+  def parallel_failure(self, details, exec_ctx):
+    return RunTimeResult().failure(RunTimeError(
+      self.start, self.end,
+      f"Worker process failed\n{details}",
+      exec_ctx
+    ))
+
+  def execute_pmap(self, exec_ctx):
+    error = self.check_function_and_list(exec_ctx)
+    if error: return RunTimeResult().failure(error)
+
+    func = exec_ctx.symbol_table.get("func")
+    elements = list(exec_ctx.symbol_table.get("list").elements)
+
+    # Imported here: the worker plumbing (pickle, process pools) is only
+    # loaded once a script actually asks for parallel work.
+    import parallel
+    options = self.program_table(exec_ctx).run_resources().pmap
+    outcome = parallel.parallel_map(func, self.captured_globals(exec_ctx), elements, exec_ctx.quota, options)
+    if outcome:
+      values, details = outcome
+      if details: return self.parallel_failure(details, exec_ctx)
+      return RunTimeResult().success(List(values))
+
+    values = []
+    for element in elements:
+      result = func.execute([element])
+      if result.error: return RunTimeResult().failure(result.error)
+      values.append(result.value)
+    return RunTimeResult().success(List(values))
+  execute_pmap.arg_names = ["func", "list"]
+
+  def execute_preduce(self, exec_ctx):
+    error = self.check_function_and_list(exec_ctx)
+    if error: return RunTimeResult().failure(error)
+
+    func = exec_ctx.symbol_table.get("func")
+    elements = list(exec_ctx.symbol_table.get("list").elements)
+
+    if len(elements) == 0:
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Cannot reduce an empty list",
+        exec_ctx
+      ))
+
+    import parallel
+    options = self.program_table(exec_ctx).run_resources().pmap
+    outcome = parallel.parallel_reduce(func, self.captured_globals(exec_ctx), elements, exec_ctx.quota, options)
+    if outcome:
+      partials, details = outcome
+      if details: return self.parallel_failure(details, exec_ctx)
+      elements = partials
+
+    accumulator = elements[0]
+    for element in elements[1:]:
+      result = func.execute([accumulator, element])
+      if result.error: return RunTimeResult().failure(result.error)
+      accumulator = result.value
+    return RunTimeResult().success(accumulator)
+  execute_preduce.arg_names = ["func", "list"]
+
+  def execute_pmap_config(self, exec_ctx):
+    workers = exec_ctx.symbol_table.get("workers")
+    chunk_size = exec_ctx.symbol_table.get("chunk_size")
+
+    if not isinstance(workers, Number) or not isinstance(chunk_size, Number):
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Arguments must be numbers",
+        exec_ctx
+      ))
+
+    # Only this environment's runs are affected, and never beyond the
+    # pool the embedder configured (parallel.configure).
+    options = self.program_table(exec_ctx).run_resources().pmap
+    options['workers'] = max(1, int(workers.value))
+    options['chunk_size'] = int(chunk_size.value) if chunk_size.value > 0 else None
+    return RunTimeResult().success(Number.null)
+  execute_pmap_config.arg_names = ["workers", "chunk_size"]
+
+  def check_buffer(self, buffer, exec_ctx):
+    if not isinstance(buffer, NumericBuffer):
+      return RunTimeError(
+        self.start, self.end,
+        "First argument must be buffer",
+        exec_ctx
+      )
+    if buffer.released:
+      return RunTimeError(
+        self.start, self.end,
+        "Buffer has been released",
+        exec_ctx
+      )
+    return None
+
+  def execute_buffer(self, exec_ctx):
+    size = exec_ctx.symbol_table.get("size")
+    kind = exec_ctx.symbol_table.get("kind")
+
+    if not isinstance(size, Number) or not isinstance(size.value, int) or size.value < 0:
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "First argument must be a non-negative integer",
+        exec_ctx
+      ))
+
+    if not isinstance(kind, String) or kind.value not in TYPECODES:
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Second argument must be \"float\" or \"int\"",
+        exec_ctx
+      ))
+
+    error = self.allocate(size.value * 8, exec_ctx)
+    if error: return RunTimeResult().failure(error)
+
+    buffer = NumericBuffer.create(size.value, TYPECODES[kind.value])
+    self.program_table(exec_ctx).run_resources().buffers.append(buffer)
+    return RunTimeResult().success(buffer)
+  execute_buffer.arg_names = ["size", "kind"]
+
+  def execute_attach_buffer(self, exec_ctx):
+    name = exec_ctx.symbol_table.get("name")
+
+    if not isinstance(name, String):
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Argument must be string",
+        exec_ctx
+      ))
+
+    try:
+      buffer = NumericBuffer.attach(name.value)
+    except (OSError, ValueError) as e:
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        f"Failed to attach buffer \"{name.value}\"\n" + str(e),
+        exec_ctx
+      ))
+    return RunTimeResult().success(buffer)
+  execute_attach_buffer.arg_names = ["name"]
+
+  def execute_buffer_name(self, exec_ctx):
+    buffer = exec_ctx.symbol_table.get("buffer")
+    error = self.check_buffer(buffer, exec_ctx)
+    if error: return RunTimeResult().failure(error)
+    return RunTimeResult().success(String(buffer.name))
+  execute_buffer_name.arg_names = ["buffer"]
+
+  def execute_buffer_set(self, exec_ctx):
+    buffer = exec_ctx.symbol_table.get("buffer")
+    error = self.check_buffer(buffer, exec_ctx)
+    if error: return RunTimeResult().failure(error)
+
+    _, error = buffer.set(exec_ctx.symbol_table.get("index"), exec_ctx.symbol_table.get("value"))
+    if error: return RunTimeResult().failure(error)
+    return RunTimeResult().success(Number.null)
+  execute_buffer_set.arg_names = ["buffer", "index", "value"]
+
+  def execute_buffer_read(self, exec_ctx):
+    buffer = exec_ctx.symbol_table.get("buffer")
+    error = self.check_buffer(buffer, exec_ctx)
+    if error: return RunTimeResult().failure(error)
+
+    start = exec_ctx.symbol_table.get("start")
+    end = exec_ctx.symbol_table.get("end")
+    if not isinstance(start, Number) or not isinstance(end, Number):
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Start and end must be numbers",
+        exec_ctx
+      ))
+
+    return RunTimeResult().success(List(buffer.read(int(start.value), int(end.value))))
+  execute_buffer_read.arg_names = ["buffer", "start", "end"]
+
+  def execute_buffer_write(self, exec_ctx):
+    buffer = exec_ctx.symbol_table.get("buffer")
+    error = self.check_buffer(buffer, exec_ctx)
+    if error: return RunTimeResult().failure(error)
+
+    start = exec_ctx.symbol_table.get("start")
+    values = exec_ctx.symbol_table.get("list")
+    if not isinstance(start, Number) or not isinstance(values, List) or not all(isinstance(value, Number) for value in values.elements):
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Arguments must be a buffer, a start index and a list of numbers",
+        exec_ctx
+      ))
+
+    try:
+      buffer.write(int(start.value), values.elements)
+    except IndexError:
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        'Index element is out of bounds',
+        exec_ctx
+      ))
+    except (OverflowError, TypeError, ValueError):
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        f'Value does not fit the buffer type ({buffer.kind})',
+        exec_ctx
+      ))
+    return RunTimeResult().success(Number.null)
+  execute_buffer_write.arg_names = ["buffer", "start", "list"]
+
+  def execute_buffer_release(self, exec_ctx):
+    buffer = exec_ctx.symbol_table.get("buffer")
+    if not isinstance(buffer, NumericBuffer):
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Argument must be buffer",
+        exec_ctx
+      ))
+
+    buffer.release()
+    return RunTimeResult().success(Number.null)
+  execute_buffer_release.arg_names = ["buffer"]
+
+  def check_file(self, file, exec_ctx):
+    if not isinstance(file, File):
+      return RunTimeError(
+        self.start, self.end,
+        "First argument must be file",
+        exec_ctx
+      )
+    if file.closed:
+      return RunTimeError(
+        self.start, self.end,
+        "File has been closed",
+        exec_ctx
+      )
+    return None
+
+  def execute_open(self, exec_ctx):
+    path = exec_ctx.symbol_table.get("path")
+    mode = exec_ctx.symbol_table.get("mode")
+
+    if not isinstance(path, String):
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "First argument must be string",
+        exec_ctx
+      ))
+
+    if not isinstance(mode, String) or mode.value not in FILE_MODES:
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Second argument must be \"r\", \"w\" or \"a\"",
+        exec_ctx
+      ))
+
+    try:
+      file = File.open(path.value, mode.value)
+    except OSError as e:
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        f"Failed to open \"{path.value}\"\n" + str(e),
+        exec_ctx
+      ))
+    return RunTimeResult().success(file)
+  execute_open.arg_names = ["path", "mode"]
+
+  def execute_read_line(self, exec_ctx):
+    file = exec_ctx.symbol_table.get("file")
+    error = self.check_file(file, exec_ctx)
+    if error: return RunTimeResult().failure(error)
+
+    try:
+      line = file.read_line(self.byte_budget(exec_ctx))
+    except (OSError, ValueError) as e:
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        f"Failed to read \"{file.path}\"\n" + str(e),
+        exec_ctx
+      ))
+
+    if line == None: return RunTimeResult().success(Number.null)
+    error = self.allocate(len(line), exec_ctx)
+    if error: return RunTimeResult().failure(error)
+    return RunTimeResult().success(String(line))
+  execute_read_line.arg_names = ["file"]
+
+  def execute_write(self, exec_ctx):
+    file = exec_ctx.symbol_table.get("file")
+    error = self.check_file(file, exec_ctx)
+    if error: return RunTimeResult().failure(error)
+
+    try:
+      file.write(str(exec_ctx.symbol_table.get("value")))
+    except (OSError, ValueError) as e:
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        f"Failed to write \"{file.path}\"\n" + str(e),
+        exec_ctx
+      ))
+    return RunTimeResult().success(Number.null)
+  execute_write.arg_names = ["file", "value"]
+
+  def execute_close(self, exec_ctx):
+    file = exec_ctx.symbol_table.get("file")
+
+    if not isinstance(file, File):
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Argument must be file",
+        exec_ctx
+      ))
+
+    file.close()
+    return RunTimeResult().success(Number.null)
+  execute_close.arg_names = ["file"]
+
+  def execute_read_numbers(self, exec_ctx):
+    path = exec_ctx.symbol_table.get("path")
+
+    if not isinstance(path, String):
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Argument must be string",
+        exec_ctx
+      ))
+
+    if path.value == '-':
+      self.flush_output(exec_ctx)
+
+    try:
+      values = read_numbers(path.value, self.byte_budget(exec_ctx))
+    except ReadLimit:
+      return RunTimeResult().failure(self.allocate(self.byte_budget(exec_ctx) + 1, exec_ctx))
+    except OSError as e:
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        f"Failed to read \"{path.value}\"\n" + str(e),
+        exec_ctx
+      ))
+    except ValueError as e:
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        f"\"{path.value}\" does not contain only numbers\n" + str(e),
+        exec_ctx
+      ))
+
+    error = self.allocate(len(values) * 8, exec_ctx)
+    if error: return RunTimeResult().failure(error)
+    return RunTimeResult().success(List(values))
+  execute_read_numbers.arg_names = ["path"]
+
+  def execute_range(self, exec_ctx):
+    start = exec_ctx.symbol_table.get("start")
+    end = exec_ctx.symbol_table.get("end")
+    step = exec_ctx.symbol_table.get("step")
+
+    if not all(isinstance(value, Number) and isinstance(value.value, int) for value in (start, end, step)):
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Arguments must be integers",
+        exec_ctx
+      ))
+
+    if step.value == 0:
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Step must not be zero",
+        exec_ctx
+      ))
+
+    return RunTimeResult().success(Range(range(start.value, end.value, step.value)))
+  execute_range.arg_names = ["start", "end", "step"]
+
+  def execute_next(self, exec_ctx):
+    from generators import Generator
+    generator = exec_ctx.symbol_table.get("generator")
+
+    if not isinstance(generator, Generator):
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Argument must be a generator",
+        exec_ctx
+      ))
+
+    value, error = generator.resume()
+    if error: return RunTimeResult().failure(error)
+    return RunTimeResult().success(value if value != None else Number.null)
+  execute_next.arg_names = ["generator"]
+
+  def execute_to_list(self, exec_ctx):
+    iterable = exec_ctx.symbol_table.get("value")
+    iterator = iterable.iterate()
+
+    if iterator == None:
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Argument is not iterable",
+        exec_ctx
+      ))
+
+    try:
+      elements = list(iterator)
+    except IterationError as e:
+      return RunTimeResult().failure(e.error)
+
+    error = self.allocate(len(elements) * 8, exec_ctx)
+    if error: return RunTimeResult().failure(error)
+    return RunTimeResult().success(List(elements))
+  execute_to_list.arg_names = ["value"]
+
+  def execute_string_builder(self, exec_ctx):
+    return RunTimeResult().success(StringBuilder())
+  execute_string_builder.arg_names = []
+
+  def execute_import(self, exec_ctx):
+    path = exec_ctx.symbol_table.get("path")
+
+    if not isinstance(path, String):
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        "Argument must be string",
+        exec_ctx
+      ))
+
+    # Imported here: the loader runs programs through this module.
+    from modules import import_module
+    importer = self.start.fn if self.start else None
+    module, details = import_module(
+      path.value, importer, self.program_table(exec_ctx),
+      exec_ctx.quota, exec_ctx.output, exec_ctx.hooks, exec_ctx.stats
+    )
+
+    if details:
+      return RunTimeResult().failure(RunTimeError(
+        self.start, self.end,
+        details,
+        exec_ctx
+      ))
+    return RunTimeResult().success(module)
+  execute_import.arg_names = ["path"]
+
   def execute_incr(self, exec_ctx):
     num = exec_ctx.symbol_table.get("value")
 
@@ -571,7 +1419,7 @@ class BuiltInFunction(BaseFunction):
         exec_ctx
       ))
 
-    _, error = run(fn, script)
+    _, error = run_program(fn, script, self.program_table(exec_ctx), exec_ctx.quota, exec_ctx.output, exec_ctx.hooks, exec_ctx.stats)
     
     if error:
       return RunTimeResult().failure(RunTimeError(
@@ -584,66 +1432,152 @@ class BuiltInFunction(BaseFunction):
     return RunTimeResult().success(Number.null)
   execute_run.arg_names = ["fn"]
 
-BuiltInFunction.print       = BuiltInFunction("print")
-BuiltInFunction.print_ret   = BuiltInFunction("print_ret")
-BuiltInFunction.input       = BuiltInFunction("input")
-BuiltInFunction.input_int   = BuiltInFunction("input_int")
-BuiltInFunction.clear       = BuiltInFunction("clear")
-BuiltInFunction.is_number   = BuiltInFunction("is_number")
-BuiltInFunction.is_string   = BuiltInFunction("is_string")
-BuiltInFunction.is_list     = BuiltInFunction("is_list")
-BuiltInFunction.is_function = BuiltInFunction("is_function")
-BuiltInFunction.append      = BuiltInFunction("append")
-BuiltInFunction.pop         = BuiltInFunction("pop")
-BuiltInFunction.extend      = BuiltInFunction("extend")
-BuiltInFunction.len			= BuiltInFunction("len")
-BuiltInFunction.run			= BuiltInFunction("run")
-BuiltInFunction.incr    = BuiltInFunction("incr")
-BuiltInFunction.decr    = BuiltInFunction("decr")
-BuiltInFunction.to_int    = BuiltInFunction("to_int")
-BuiltInFunction.to_float    = BuiltInFunction("to_float")
-BuiltInFunction.to_string    = BuiltInFunction("to_string")
-
-
-global_symbol_table = SymbolTable()
+# Ozen name -> BuiltInFunction name. The functions are created on first
+# lookup rather than at import, so a short script only pays for the
+# builtins it actually uses.
+BUILTINS = {
+  "print":          "print",
+  "return_print":   "print_ret",
+  "user_in":        "input",
+  "num_user_in":    "input_int",
+  "clear":          "clear",
+  "cls":            "clear",
+  "is_num":         "is_number",
+  "is_string":      "is_string",
+  "is_list":        "is_list",
+  "is_func":        "is_function",
+  "is_map":         "is_map",
+  "is_record":      "is_record",
+  "append":         "append",
+  "pop":            "pop",
+  "extend":         "extend",
+  "length":         "len",
+  "run":            "run",
+  "import":         "import",
+  "incr":           "incr",
+  "decr":           "decr",
+  "to_int":         "to_int",
+  "to_float":       "to_float",
+  "to_string":      "to_string",
+  "string_builder": "string_builder",
+  "range":          "range",
+  "next":           "next",
+  "to_list":        "to_list",
+  "sleep":          "sleep",
+  "spawn":          "spawn",
+  "wait":           "wait",
+  "pmap":           "pmap",
+  "preduce":        "preduce",
+  "pmap_config":    "pmap_config",
+  "buffer":         "buffer",
+  "attach_buffer":  "attach_buffer",
+  "buffer_name":    "buffer_name",
+  "buffer_set":     "buffer_set",
+  "buffer_read":    "buffer_read",
+  "buffer_write":   "buffer_write",
+  "buffer_release": "buffer_release",
+  "open":           "open",
+  "read_line":      "read_line",
+  "write":          "write",
+  "close":          "close",
+  "read_numbers":   "read_numbers",
+  "get":            "get",
+  "set":            "set",
+  "has":            "has",
+  "delete":         "delete",
+  "keys":           "keys",
+  "values":         "values",
+}
+
+def load_builtin(name):
+  builtin = BUILTINS.get(name, None)
+  return BuiltInFunction(builtin) if builtin else None
+
+global_symbol_table = SymbolTable(is_global=True)
+global_symbol_table.loader = load_builtin
 global_symbol_table.set("null", Number.null)
 global_symbol_table.set("false", Number.false)
 global_symbol_table.set("true", Number.true)
 global_symbol_table.set("math_pi", Number.math_PI)
-global_symbol_table.set("print", BuiltInFunction.print)
-global_symbol_table.set("return_print", BuiltInFunction.print_ret)
-global_symbol_table.set("user_in", BuiltInFunction.input)
-global_symbol_table.set("num_user_in", BuiltInFunction.input_int)
-global_symbol_table.set("clear", BuiltInFunction.clear)
-global_symbol_table.set("cls", BuiltInFunction.clear)
-global_symbol_table.set("is_num", BuiltInFunction.is_number)
-global_symbol_table.set("is_string", BuiltInFunction.is_string)
-global_symbol_table.set("is_list", BuiltInFunction.is_list)
-global_symbol_table.set("is_func", BuiltInFunction.is_function)
-global_symbol_table.set("append", BuiltInFunction.append)
-global_symbol_table.set("pop", BuiltInFunction.pop)
-global_symbol_table.set("extend", BuiltInFunction.extend)
-global_symbol_table.set("length", BuiltInFunction.len)
-global_symbol_table.set("run", BuiltInFunction.run)
-global_symbol_table.set("incr", BuiltInFunction.incr)
-global_symbol_table.set("decr", BuiltInFunction.decr)
-global_symbol_table.set("to_int", BuiltInFunction.to_int)
-global_symbol_table.set("to_float", BuiltInFunction.to_float)
-global_symbol_table.set("to_string", BuiltInFunction.to_string)
-
-
-def run(fn, text):
+
+def run(fn, text, environment=None, limits=None, output=None, hooks=None, stats=None):
+  # Pass a RunStats as stats to get the run's phase times and counters.
+  # Once metrics.enable() has been called every run collects one and adds
+  # it to the process metrics. Without an environment the run gets one of
+  # its own, released (buffers unlinked) when it ends.
+  if environment is not None:
+    return run_in(fn, text, environment, limits, output, hooks, stats)
+
+  environment = Environment(global_symbol_table)
+  try:
+    return run_in(fn, text, environment, limits, output, hooks, stats)
+  finally:
+    environment.release()
+
+def run_in(fn, text, environment, limits=None, output=None, hooks=None, stats=None):
+  quota = Quota(limits) if limits is not None else None
+  if stats is None and metrics.registry:
+    stats = RunStats()
+  if stats is None:
+    return run_program(fn, text, environment.symbol_table, quota, output, hooks)
+
+  value = None
+  start = None
+  try:
+    node, error = parse(fn, text, stats)
+    if not error:
+      start = time.perf_counter()
+      value, error = evaluate(node, environment.symbol_table, quota, output, hooks, stats)
+    stats.error = error.error_name if error else None
+  except BaseException as e:
+    # A Python exception (e.g. RecursionError) still counts as a failed run.
+    stats.error = type(e).__name__
+    raise
+  finally:
+    if start is not None:
+      stats.eval += time.perf_counter() - start
+    metrics.record(stats)
+  return value, error
+
+def parse(fn, text, stats=None):
+  start = time.perf_counter()
   lexer = LexicalAnalyzer(fn, text)
   tokens, error = lexer.init_tokens()
+  if stats:
+    lexed = time.perf_counter()
+    stats.lex += lexed - start
+    stats.tokens += len(tokens)
   if error: return None, error
   
   parser = Parser(tokens)
   pars = parser.parse()
+  if stats: stats.parse += time.perf_counter() - lexed
   if pars.error: return None, pars.error
+  return pars.node, None
+
+def run_program(fn, text, symbol_table, quota=None, output=None, hooks=None, stats=None):
+  # Nested programs (the run builtin) share their parent's stats; their
+  # parse time counts towards the parent's eval.
+  node, error = parse(fn, text)
+  if error: return None, error
+  return evaluate(node, symbol_table, quota, output, hooks, stats)
 
-  interpreter = Interpreter()
+def evaluate(node, symbol_table, quota=None, output=None, hooks=None, stats=None):
+  hooks = run_hooks(hooks)
+  interpreter = HookedInterpreter(hooks) if hooks else Interpreter()
   context = Context('<program>')
-  context.symbol_table = global_symbol_table
-  result = interpreter.visit(pars.node, context)
+  context.symbol_table = symbol_table
+  context.quota = quota
+  context.output = output if output is not None else OutputSink()
+  context.hooks = hooks
+  context.stats = stats
+
+  if hooks: hooks.run_start(context)
+  result = None
+  try:
+    result = interpreter.visit(node, context)
+  finally:
+    if hooks: hooks.run_end(context, result)
+    context.output.flush()
 
   return result.value, result.error
\ No newline at end of file
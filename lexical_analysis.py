@@ -1,5 +1,6 @@
 from tokens import *
 from errors import *
+import sys
 
 class LexicalAnalyzer:
   def __init__(self, fn, text):
@@ -60,6 +61,18 @@ class LexicalAnalyzer:
       elif self.current_char == ']':
         tokens.append(Token(TKN_RSQUARE, start=self.pos))
         self.next()
+      elif self.current_char == '{':
+        tokens.append(Token(TKN_LBRACE, start=self.pos))
+        self.next()
+      elif self.current_char == '}':
+        tokens.append(Token(TKN_RBRACE, start=self.pos))
+        self.next()
+      elif self.current_char == ':':
+        tokens.append(Token(TKN_COLON, start=self.pos))
+        self.next()
+      elif self.current_char == '.':
+        tokens.append(Token(TKN_DOT, start=self.pos))
+        self.next()
       elif self.current_char == '!':
         token, error = self.la_not_equals()
         if error: return [], error
@@ -122,7 +135,7 @@ class LexicalAnalyzer:
       escape_character = False
     
     self.next()
-    return Token(TKN_STRING, string, start, self.pos)
+    return Token(TKN_STRING, sys.intern(string), start, self.pos)
 
   def la_identifier(self):
     id_str = ''
@@ -133,7 +146,7 @@ class LexicalAnalyzer:
       self.next()
 
     tok_type = TKN_KEYWORD if id_str in KEYWORDS else TKN_IDENTIFIER
-    return Token(tok_type, id_str, start, self.pos)
+    return Token(tok_type, sys.intern(id_str), start, self.pos)
 
   def la_not_equals(self):
     start = self.pos.copy()
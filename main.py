@@ -1,14 +1,21 @@
-from interpreter import run
-
-while True:
-	text = input('.ozen > ')
-	if text.strip() == "": continue
-	result, error = run('<stdin>', text)
-
-	if error:
-		print(error.arrow_string())
-	elif result:
-		if len(result.elements) == 1:
-			print(repr(result.elements[0]))
-		else:
-			print(repr(result))
+from interpreter import run, global_symbol_table
+from context import Environment
+
+def main():
+	environment = Environment(global_symbol_table)
+
+	while True:
+		text = input('.ozen > ')
+		if text.strip() == "": continue
+		result, error = run('<stdin>', text, environment)
+
+		if error:
+			print(error.arrow_string())
+		elif result:
+			if len(result.elements) == 1:
+				print(repr(result.elements[0]))
+			else:
+				print(repr(result))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,172 @@
+from hooks import Hook
+from runtime import RunTimeResult
+from datatype import Value
+from context import Context, SymbolTable
+import gc
+import tracemalloc
+
+TRACKED_TYPES = (Value, Context, SymbolTable, RunTimeResult)
+
+def live_objects():
+  # Live interpreter objects per type name, from a walk of the gc heap.
+  counts = {}
+  for obj in gc.get_objects():
+    if isinstance(obj, TRACKED_TYPES):
+      name = type(obj).__name__
+      counts[name] = counts.get(name, 0) + 1
+  return counts
+
+def kib(size):
+  return f'{size / 1024:+.1f} KiB'
+
+class MemorySnapshot:
+  # Heap state at one point of a run: the traced Python allocations, live
+  # interpreter objects per type and the net bytes per ozen line so far.
+  # Byte counts leave out what earlier snapshots hold.
+  def __init__(self, label, lines, overhead):
+    current, peak = tracemalloc.get_traced_memory()
+    self.label = label
+    self.current = current - overhead
+    self.peak = peak - overhead
+    self.traced = tracemalloc.take_snapshot().filter_traces((
+      tracemalloc.Filter(False, tracemalloc.__file__),
+      tracemalloc.Filter(False, __file__),
+    ))
+    self.live = live_objects()
+    self.lines = {key: stats[1] for key, stats in lines.items()}
+
+  def __repr__(self):
+    return f'<memory snapshot {self.label} {self.current / 1024:.1f} KiB>'
+
+def diff(old, new, limit=10):
+  # What grew between two snapshots: live objects per type, net bytes per
+  # ozen line and the Python lines that allocated the difference.
+  lines = [f'Memory from {old.label} to {new.label}: {kib(new.current - old.current)} (peak {new.peak / 1024:.1f} KiB)\n']
+
+  lines.append('\nLive objects\n')
+  names = set(old.live) | set(new.live)
+  changes = sorted(((new.live.get(name, 0) - old.live.get(name, 0), name) for name in names), reverse=True)
+  for change, name in changes[:limit]:
+    if change: lines.append(f'{change:>+12}  {name}\n')
+
+  lines.append('\nOzen lines\n')
+  keys = set(old.lines) | set(new.lines)
+  changes = sorted(((new.lines.get(key, 0) - old.lines.get(key, 0), key) for key in keys), reverse=True)
+  for change, (fn, line) in changes[:limit]:
+    if change: lines.append(f'{kib(change):>12}  {fn}:{line}\n')
+
+  lines.append('\nPython allocation sites\n')
+  for stat in new.traced.compare_to(old.traced, 'lineno')[:limit]:
+    if stat.size_diff:
+      frame = stat.traceback[0]
+      lines.append(f'{kib(stat.size_diff):>12}  {frame.filename}:{frame.lineno}\n')
+  return ''.join(lines)
+
+class MemoryProfiler(Hook):
+  # Memory profile of a run, built on the run hooks and tracemalloc. Each
+  # node's net traced bytes (allocated minus freed, children excluded) go
+  # to its ozen line, and the values nodes produce are counted per type
+  # and per line; every call adds a Context/SymbolTable pair and every
+  # node a RunTimeResult. Snapshots are taken when the run starts and
+  # ends and the first time any line in marks is reached; diff() compares
+  # two of them.
+  def __init__(self, marks=()):
+    self.marks = set(marks)
+    self.types = {}       # type name -> objects created
+    self.lines = {}       # (file, line) -> [values produced, net bytes]
+    self.snapshots = []
+    self.visits = []      # open visits: [line key, bytes at entry, child bytes]
+    self.depth = 0
+    self.started = False
+    self.overhead = 0     # traced bytes held by the snapshots themselves
+    self.peak = 0
+
+  def count(self, name):
+    self.types[name] = self.types.get(name, 0) + 1
+
+  def traced(self):
+    return tracemalloc.get_traced_memory()[0] - self.overhead
+
+  def snapshot(self, label):
+    before = tracemalloc.get_traced_memory()[0]
+    snapshot = MemorySnapshot(label, self.lines, self.overhead)
+    self.snapshots.append(snapshot)
+    self.overhead += tracemalloc.get_traced_memory()[0] - before
+    return snapshot
+
+  def run_start(self, context):
+    self.depth += 1
+    if self.depth > 1: return
+
+    if not tracemalloc.is_tracing():
+      tracemalloc.start()
+      self.started = True
+    tracemalloc.reset_peak()
+    self.snapshot('start')
+
+  def run_end(self, context, result):
+    self.depth -= 1
+    if self.depth > 0: return
+
+    self.peak = max(self.peak, self.snapshot('end').peak)
+    if self.started:
+      tracemalloc.stop()
+      self.started = False
+
+  def function_call(self, function, args, context):
+    self.count('Context')
+    self.count('SymbolTable')
+
+  def node_enter(self, node, context):
+    key = (node.start.fn, node.start.line + 1)
+    if self.marks and key[1] in self.marks:
+      self.marks.discard(key[1])
+      self.snapshot(f'{key[0]}:{key[1]}')
+    self.visits.append([key, self.traced(), 0, []])
+
+  def node_exit(self, node, context, result):
+    # A node that hands on a child's value (let, return, a parenthesised
+    # expression) did not create it, so values are only counted by the
+    # node whose children did not already return them.
+    key, entry, child, child_values = self.visits.pop()
+    net = self.traced() - entry
+    parent = self.visits[-1] if self.visits else None
+    if parent: parent[2] += net
+
+    stats = self.lines.get(key, None)
+    if stats is None:
+      stats = self.lines[key] = [0, 0]
+    stats[1] += net - child
+
+    if result is None: return
+    self.count('RunTimeResult')
+    value = result.value
+    if value is None: return
+    if parent: parent[3].append(value)
+    if any(value is child_value for child_value in child_values): return
+    stats[0] += 1
+    self.count(type(value).__name__)
+
+  ###################################
+
+  def report(self, limit=20):
+    lines = [f'Peak traced memory: {self.peak / 1024:.1f} KiB\n']
+
+    lines += ['\nObjects created (by type)\n', f'{"count":>12}  type\n']
+    for name, count in sorted(self.types.items(), key=lambda item: item[1], reverse=True)[:limit]:
+      lines.append(f'{count:>12}  {name}\n')
+
+    if self.snapshots:
+      lines += ['\nLive objects at end (by type)\n', f'{"count":>12}  type\n']
+      live = self.snapshots[-1].live
+      for name, count in sorted(live.items(), key=lambda item: item[1], reverse=True)[:limit]:
+        lines.append(f'{count:>12}  {name}\n')
+
+    lines += ['\nLines (by net bytes)\n', f'{"values":>12} {"net":>12}  line\n']
+    for (fn, line), (values, size) in sorted(self.lines.items(), key=lambda item: item[1][1], reverse=True)[:limit]:
+      lines.append(f'{values:>12} {kib(size):>12}  {fn}:{line}\n')
+    return ''.join(lines)
+
+  def write_report(self, path, limit=20):
+    with open(path, 'w', encoding='utf-8') as f:
+      f.write(self.report(limit))
@@ -0,0 +1,193 @@
+import bisect
+import os
+import threading
+
+class RunStats:
+  # Phase timings and counters for one run. The times are the top-level
+  # program's; nested run() and import() programs count towards eval and
+  # add their calls, iterations and depth to the same counters.
+  __slots__ = ('lex', 'parse', 'eval', 'tokens', 'calls', 'iterations', 'max_depth', 'error')
+
+  def __init__(self):
+    self.lex = 0.0
+    self.parse = 0.0
+    self.eval = 0.0
+    self.tokens = 0
+    self.calls = 0
+    self.iterations = 0
+    self.max_depth = 0
+    self.error = None
+
+  def call(self, depth):
+    self.calls += 1
+    if depth > self.max_depth:
+      self.max_depth = depth
+
+  @property
+  def total(self):
+    return self.lex + self.parse + self.eval
+
+  def as_dict(self):
+    return {name: getattr(self, name) for name in self.__slots__}
+
+  @classmethod
+  def from_dict(cls, values):
+    stats = cls()
+    for name in cls.__slots__:
+      setattr(stats, name, values[name])
+    return stats
+
+  def __repr__(self):
+    return (
+      f'<run stats lex {self.lex * 1000:.3f}ms parse {self.parse * 1000:.3f}ms eval {self.eval * 1000:.3f}ms, '
+      f'{self.calls} calls, {self.iterations} iterations, depth {self.max_depth}>'
+    )
+
+###################################
+
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+COUNT_BUCKETS = (0, 10, 100, 1000, 10**4, 10**5, 10**6, 10**7)
+
+def format_value(value):
+  if value == float('inf'): return '+Inf'
+  return repr(value) if isinstance(value, float) else str(value)
+
+def format_labels(labels):
+  if not labels: return ''
+  return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+class Counter:
+  # A monotonically increasing total per label value (None for a metric
+  # without a label).
+  kind = 'counter'
+
+  def __init__(self, name, help, label=None):
+    self.name = name
+    self.help = help
+    self.label = label
+    self.values = {}
+
+  def inc(self, amount=1, label=None):
+    self.values[label] = self.values.get(label, 0) + amount
+
+  def samples(self):
+    for label, value in sorted(self.values.items(), key=lambda item: str(item[0])):
+      yield self.name, ((self.label, label),) if self.label else (), value
+
+class Histogram:
+  # Observations counted into fixed buckets, plus their sum and count.
+  # Buckets hold their own count and are made cumulative when rendered.
+  kind = 'histogram'
+
+  def __init__(self, name, help, buckets, label=None):
+    self.name = name
+    self.help = help
+    self.buckets = tuple(buckets)
+    self.label = label
+    self.series = {}      # label value -> [bucket counts (+Inf last), sum, count]
+
+  def observe(self, value, label=None):
+    series = self.series.get(label, None)
+    if series is None:
+      series = self.series[label] = [[0] * (len(self.buckets) + 1), 0, 0]
+    series[0][bisect.bisect_left(self.buckets, value)] += 1
+    series[1] += value
+    series[2] += 1
+
+  def samples(self):
+    for label, (counts, total, count) in sorted(self.series.items(), key=lambda item: str(item[0])):
+      labels = ((self.label, label),) if self.label else ()
+      cumulative = 0
+      for bound, bucket in zip(self.buckets + (float('inf'),), counts):
+        cumulative += bucket
+        yield self.name + '_bucket', labels + (('le', format_value(bound)),), cumulative
+      yield self.name + '_sum', labels, total
+      yield self.name + '_count', labels, count
+
+class Registry:
+  # Process-wide totals over every run recorded, shared by all threads.
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.runs = Counter('ozen_runs_total', 'Programs run, by outcome.', 'status')
+    self.seconds = Histogram('ozen_phase_seconds', 'Time per run spent in each phase.', SECONDS_BUCKETS, 'phase')
+    self.tokens = Counter('ozen_tokens_total', 'Tokens lexed.')
+    self.calls = Counter('ozen_calls_total', 'Function calls, ozen and builtin.')
+    self.iterations = Counter('ozen_loop_iterations_total', 'Loop iterations.')
+    self.calls_per_run = Histogram('ozen_run_calls', 'Function calls per run.', COUNT_BUCKETS)
+    self.iterations_per_run = Histogram('ozen_run_loop_iterations', 'Loop iterations per run.', COUNT_BUCKETS)
+    self.depth = Histogram('ozen_run_max_depth', 'Deepest call nesting per run.', DEPTH_BUCKETS)
+    self.metrics = (
+      self.runs, self.seconds, self.tokens, self.calls, self.iterations,
+      self.calls_per_run, self.iterations_per_run, self.depth,
+    )
+
+  def record(self, stats):
+    with self.lock:
+      self.runs.inc(1, 'error' if stats.error else 'ok')
+      for phase in ('lex', 'parse', 'eval'):
+        self.seconds.observe(getattr(stats, phase), phase)
+      self.tokens.inc(stats.tokens)
+      self.calls.inc(stats.calls)
+      self.iterations.inc(stats.iterations)
+      self.calls_per_run.observe(stats.calls)
+      self.iterations_per_run.observe(stats.iterations)
+      self.depth.observe(stats.max_depth)
+
+  def render(self):
+    # The Prometheus text exposition format.
+    lines = []
+    with self.lock:
+      for metric in self.metrics:
+        lines.append(f'# HELP {metric.name} {metric.help}\n')
+        lines.append(f'# TYPE {metric.name} {metric.kind}\n')
+        for name, labels, value in metric.samples():
+          lines.append(f'{name}{format_labels(labels)} {format_value(value)}\n')
+    return ''.join(lines)
+
+  def write(self, path):
+    # Replaced atomically, so a collector (e.g. node_exporter's textfile
+    # directory) never reads a half-written file.
+    temp = f'{path}.{os.getpid()}.tmp'
+    with open(temp, 'w', encoding='utf-8') as f:
+      f.write(self.render())
+    os.replace(temp, path)
+
+registry = None
+
+def enable():
+  # Starts recording every run() (and Engine/AsyncEngine run) in this
+  # process; until then runs collect nothing they were not asked for.
+  global registry
+  if registry is None:
+    registry = Registry()
+  return registry
+
+def record(stats):
+  if registry: registry.record(stats)
+
+def serve(port=9464, host='127.0.0.1'):
+  # Serves the metrics at http://host:port/metrics from a daemon thread.
+  # Imported here: most runs never serve metrics and http.server is slow
+  # to import.
+  from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+  target = enable()
+
+  class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+      if self.path.split('?')[0] != '/metrics':
+        self.send_error(404)
+        return
+      body = target.render().encode('utf-8')
+      self.send_response(200)
+      self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+      self.send_header('Content-Length', str(len(body)))
+      self.end_headers()
+      self.wfile.write(body)
+
+    def log_message(self, format, *args):
+      pass
+
+  server = ThreadingHTTPServer((host, port), MetricsHandler)
+  threading.Thread(target=server.serve_forever, name='ozen-metrics', daemon=True).start()
+  return server
@@ -0,0 +1,98 @@
+from context import Environment
+from datatype import Module
+from interpreter import parse, evaluate, global_symbol_table
+import hashlib
+import os
+import threading
+
+# resolved path -> ((mtime_ns, size), sha256 digest, parsed program)
+program_cache = {}
+# resolved path -> lock held while that file is read and parsed
+load_locks = {}
+cache_lock = threading.Lock()
+
+def resolve_path(path, importer):
+  # Relative paths are looked up next to the importing file first, then in
+  # the working directory.
+  if not os.path.isabs(path) and importer and os.path.isfile(importer):
+    candidate = os.path.join(os.path.dirname(os.path.abspath(importer)), path)
+    if os.path.exists(candidate):
+      path = candidate
+  return os.path.realpath(path)
+
+def load_program(path, resolved):
+  # Returns ((version, digest, node), error_details). A file is parsed once
+  # per content: an unchanged (mtime, size) returns the cached program, a
+  # changed stat with the same sha256 just refreshes the entry. Only the
+  # path being loaded is locked, so other imports go on meanwhile.
+  with cache_lock:
+    lock = load_locks.get(resolved, None)
+    if lock is None:
+      lock = load_locks[resolved] = threading.Lock()
+
+  with lock:
+    try:
+      stat = os.stat(resolved)
+      version = (stat.st_mtime_ns, stat.st_size)
+      cached = program_cache.get(resolved, None)
+      if cached and cached[0] == version:
+        return cached, None
+
+      with open(resolved, 'rb') as f:
+        data = f.read()
+    except OSError as e:
+      return None, f'Failed to import "{path}"\n{e}'
+
+    digest = hashlib.sha256(data).digest()
+    if cached and cached[1] == digest:
+      program = program_cache[resolved] = (version, digest, cached[2])
+      return program, None
+
+    node, error = parse(resolved, data.decode('utf-8'))
+    if error:
+      return None, f'Failed to import "{path}"\n' + error.arrow_string()
+    program = program_cache[resolved] = (version, digest, node)
+    return program, None
+
+def import_module(path, importer, namespace, quota=None, output=None, hooks=None, stats=None):
+  # Returns (module, error_details). Modules belong to the run that
+  # imports them: they are executed once per run (per namespace, the run's
+  # global table) and only the parsed program is shared between runs, so
+  # no run sees another's module globals, limits or output.
+  resolved = resolve_path(path, importer)
+  resources = namespace.run_resources()
+  modules = resources.modules
+
+  if resolved in modules and modules[resolved] is None:
+    return None, f'Circular import of "{path}"'
+
+  program, details = load_program(path, resolved)
+  if details: return None, details
+
+  loaded = modules.get(resolved, None)
+  if loaded and loaded[0] == program[1]:
+    return loaded[1], None
+  return execute_module(resolved, program, resources, quota, output, hooks, stats)
+
+def execute_module(path, program, resources, quota, output, hooks, stats):
+  # The path maps to None while the body runs, so an import cycle is
+  # reported instead of recursing.
+  modules = resources.modules
+  previous = modules.get(path, None)
+  modules[path] = None
+  environment = Environment(global_symbol_table)
+  environment.symbol_table.resources = resources
+
+  try:
+    _, error = evaluate(program[2], environment.symbol_table, quota, output, hooks, stats)
+  finally:
+    if previous: modules[path] = previous
+    else: del modules[path]
+
+  if error:
+    return None, f'Failed to import "{path}"\n' + error.arrow_string()
+
+  name = os.path.splitext(os.path.basename(path))[0]
+  module = Module(name, path, environment.symbol_table)
+  modules[path] = (program[1], module)
+  return module, None
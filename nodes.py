@@ -25,13 +25,26 @@ class ListNode:
     self.start = start
     self.end = end
 
+class MapNode:
+  def __init__(self, pair_nodes, start, end):
+    self.pair_nodes = pair_nodes
+
+    self.start = start
+    self.end = end
+
 class VarAccessNode:
   def __init__(self, var_name_tkn):
     self.var_name_tkn = var_name_tkn
+    self.global_cache = None
 
     self.start = self.var_name_tkn.start
     self.end = self.var_name_tkn.end
 
+  def __getstate__(self):
+    state = dict(self.__dict__)
+    state['global_cache'] = None
+    return state
+
 class VarAssignNode:
   def __init__(self, var_name_tkn, value_node):
     self.var_name_tkn = var_name_tkn
@@ -83,6 +96,16 @@ class ForNode:
     self.start = self.var_name_tkn.start
     self.end = self.body_node.end
 
+class ForInNode:
+  def __init__(self, var_name_tkn, iterable_node, body_node, should_return_null):
+    self.var_name_tkn = var_name_tkn
+    self.iterable_node = iterable_node
+    self.body_node = body_node
+    self.should_return_null = should_return_null
+
+    self.start = self.var_name_tkn.start
+    self.end = self.body_node.end
+
 class WhileNode:
   def __init__(self, condition_node, body_node, should_return_null):
     self.condition_node = condition_node
@@ -93,11 +116,12 @@ class WhileNode:
     self.end = self.body_node.end
 
 class FuncDefNode:
-  def __init__(self, var_name_tkn, arg_name_tkns, body_node, should_auto_return):
+  def __init__(self, var_name_tkn, arg_name_tkns, body_node, should_auto_return, is_generator=False):
     self.var_name_tkn = var_name_tkn
     self.arg_name_tkns = arg_name_tkns
     self.body_node = body_node
     self.should_auto_return = should_auto_return
+    self.is_generator = is_generator
 
     if self.var_name_tkn:
       self.start = self.var_name_tkn.start
@@ -108,6 +132,28 @@ class FuncDefNode:
 
     self.end = self.body_node.end
 
+class RecordDefNode:
+  def __init__(self, var_name_tkn, field_name_tkns, start, end):
+    self.var_name_tkn = var_name_tkn
+    self.field_name_tkns = field_name_tkns
+
+    self.start = start
+    self.end = end
+
+class FieldAccessNode:
+  def __init__(self, node, field_name_tkn):
+    self.node = node
+    self.field_name_tkn = field_name_tkn
+    self.field_cache = None
+
+    self.start = self.node.start
+    self.end = self.field_name_tkn.end
+
+  def __getstate__(self):
+    state = dict(self.__dict__)
+    state['field_cache'] = None
+    return state
+
 class CallNode:
   def __init__(self, node_to_call, arg_nodes):
     self.node_to_call = node_to_call
@@ -127,6 +173,13 @@ class ReturnNode:
     self.start = start
     self.end = end
 
+class YieldNode:
+  def __init__(self, node_to_yield, start, end):
+    self.node_to_yield = node_to_yield
+
+    self.start = start
+    self.end = end
+
 class ContinueNode:
   def __init__(self, start, end):
     self.start = start
@@ -0,0 +1,62 @@
+import sys
+import threading
+
+FLUSH_POLICIES = ('auto', 'line', 'block')
+
+def is_terminal(target):
+  target = target if target is not None else sys.stdout
+  isatty = getattr(target, 'isatty', None)
+  try:
+    return bool(isatty and isatty())
+  except ValueError:
+    return False
+
+class OutputSink:
+  # Collects what a run prints and hands it to the target in large writes.
+  # The target is a file-like object (anything with write), a callable that
+  # takes each chunk of text, or None for whatever sys.stdout is at flush
+  # time. 'line' flushes after every newline, 'block' once buffer_size
+  # characters are pending, and 'auto' picks 'line' for terminals.
+  def __init__(self, target=None, flush='auto', buffer_size=1 << 16):
+    if flush not in FLUSH_POLICIES:
+      raise ValueError(f'flush must be one of {", ".join(FLUSH_POLICIES)}')
+
+    self.target = target
+    self.buffer_size = buffer_size
+    self.line_buffered = flush == 'line' or (flush == 'auto' and is_terminal(target))
+    self.parts = []
+    self.pending = 0
+    self.lock = threading.Lock()          # guards parts and pending
+    self.flush_lock = threading.Lock()    # keeps flushed chunks in order
+
+  def write(self, text):
+    with self.lock:
+      self.parts.append(text)
+      self.pending += len(text)
+      full = self.pending >= self.buffer_size
+
+    if full or (self.line_buffered and '\n' in text):
+      self.flush()
+
+  def flush(self):
+    with self.flush_lock:
+      with self.lock:
+        if not self.parts: return
+        text = ''.join(self.parts)
+        self.parts = []
+        self.pending = 0
+
+      target = self.target if self.target is not None else sys.stdout
+      if callable(target) and not hasattr(target, 'write'):
+        target(text)
+        return
+
+      target.write(text)
+      flush = getattr(target, 'flush', None)
+      if flush: flush()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.flush()
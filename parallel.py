@@ -0,0 +1,230 @@
+from context import Context, Environment
+from quota import Limits, Quota
+import ast
+import os
+import pickle
+import sys
+import threading
+
+settings = {
+  'workers': os.cpu_count() or 1,
+  'chunk_size': None,
+  'min_items': 32,
+}
+
+executor = None
+executor_lock = threading.Lock()
+payload_cache = {}
+entry_safe = None
+
+def configure(workers=None, chunk_size=None, min_items=None):
+  # Process-wide, for the embedder: the pool size and the defaults every
+  # run starts from. Scripts adjust their own run with pmap_config.
+  global executor
+
+  with executor_lock:
+    if workers is not None and workers != settings['workers']:
+      settings['workers'] = max(1, int(workers))
+      if executor is not None:
+        executor.shutdown(wait=False)
+        executor = None
+    if chunk_size is not None:
+      settings['chunk_size'] = int(chunk_size) if chunk_size > 0 else None
+    if min_items is not None:
+      settings['min_items'] = int(min_items)
+
+def get_executor():
+  global executor
+
+  with executor_lock:
+    if executor is None:
+      # Imported here: the process pool machinery is the slowest part of
+      # starting the interpreter and only pmap/preduce need it.
+      from concurrent.futures import ProcessPoolExecutor
+      import multiprocessing
+
+      methods = multiprocessing.get_all_start_methods()
+      mp_context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+      executor = ProcessPoolExecutor(max_workers=settings['workers'], mp_context=mp_context)
+    return executor
+
+def is_guarded(statement):
+  # if __name__ == '__main__': ...
+  if not isinstance(statement, ast.If) or not isinstance(statement.test, ast.Compare): return False
+  test = statement.test
+  return (
+    getattr(test.left, 'id', None) == '__name__' and len(test.comparators) == 1
+    and getattr(test.comparators[0], 'value', None) == '__main__'
+  )
+
+def entry_is_safe():
+  # forkserver and spawn workers re-import the entry script as __mp_main__.
+  # A script whose top level does more than import and define things
+  # outside an if __name__ == '__main__' guard (such as a REPL waiting on
+  # input) would do it again in every worker, so pmap stays in-process.
+  global entry_safe
+  if entry_safe is None:
+    path = getattr(sys.modules.get('__main__'), '__file__', None)
+    try:
+      with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    except (TypeError, OSError, SyntaxError, ValueError):
+      entry_safe = path is None
+      return entry_safe
+
+    setup = (
+      ast.Import, ast.ImportFrom, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef,
+      ast.Assign, ast.AnnAssign, ast.AugAssign, ast.Pass,
+    )
+    entry_safe = all(
+      isinstance(statement, setup) or is_guarded(statement)
+      or (isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Constant))
+      for statement in tree.body
+    )
+  return entry_safe
+
+def run_settings(options):
+  # (workers, chunk_size) for one run: the process-wide settings with the
+  # run's pmap_config choices on top. A run may use fewer workers than the
+  # pool has, never more.
+  options = options or {}
+  workers = settings['workers']
+  if options.get('workers'):
+    workers = min(options['workers'], workers)
+  chunk_size = options['chunk_size'] if 'chunk_size' in options else settings['chunk_size']
+  return workers, chunk_size
+
+def should_parallelize(count, workers):
+  return workers > 1 and count >= settings['min_items'] and entry_is_safe()
+
+def split_chunks(elements, workers, chunk_size):
+  # Four chunks per worker balance the load across the whole pool. A run
+  # limited to fewer workers gets at most one chunk per worker, so it
+  # never has more of the shared pool busy than it asked for.
+  if workers < settings['workers']:
+    chunk_size = max(chunk_size or 1, -(-len(elements) // workers))
+  else:
+    chunk_size = chunk_size or max(1, -(-len(elements) // (workers * 4)))
+  return [elements[i:i + chunk_size] for i in range(0, len(elements), chunk_size)]
+
+###################################
+
+def load_payload(payload, limits):
+  cached = payload_cache.get(payload, None)
+  if cached is not None: return start_chunk(cached, limits)
+
+  # Imported here so the parent process does not pay for it on import.
+  from interpreter import global_symbol_table
+
+  func, captured = pickle.loads(payload)
+  environment = Environment(global_symbol_table)
+  for name, value in captured.items():
+    environment.symbol_table.set(name, value)
+
+  context = Context('<worker>')
+  context.symbol_table = environment.symbol_table
+  func.set_context(context)
+
+  if len(payload_cache) >= 16:
+    payload_cache.clear()
+  payload_cache[payload] = func
+  return start_chunk(func, limits)
+
+def start_chunk(func, limits):
+  # Each chunk gets fresh counters under its share of the caller's limits.
+  func.context.quota = Quota(limits) if limits is not None else None
+  return func
+
+def used(func):
+  quota = func.context.quota
+  return (quota.steps, quota.bytes) if quota else (0, 0)
+
+def map_chunk(payload, limits, chunk):
+  func = load_payload(payload, limits)
+  values = []
+
+  for element in chunk:
+    result = func.execute([element])
+    if result.error: return False, result.error.arrow_string(), used(func)
+    values.append(result.value)
+
+  return True, values, used(func)
+
+def reduce_chunk(payload, limits, chunk):
+  func = load_payload(payload, limits)
+  accumulator = chunk[0]
+
+  for element in chunk[1:]:
+    result = func.execute([accumulator, element])
+    if result.error: return False, result.error.arrow_string(), used(func)
+    accumulator = result.value
+
+  return True, [accumulator], used(func)
+
+def share(total, used, count):
+  if total is None: return None
+  return max(total - used, 0) // count
+
+def chunk_limits(quota, count):
+  # What is left of the caller's budget, split evenly across the chunks,
+  # so a parallel map can do no more work than the same loop in-process.
+  if quota is None: return None
+  limits = quota.limits
+  return Limits(
+    share(limits.max_steps, quota.steps, count),
+    quota.remaining(),
+    limits.max_depth,
+    share(limits.max_bytes, quota.bytes, count),
+  )
+
+def run_chunks(worker, func, captured, elements, quota, options):
+  # Returns (values, error_text), or None when the function cannot be
+  # shipped to the pool and the caller should run it in-process. Once
+  # anything has been submitted, failures are reported, never retried,
+  # and the steps and bytes the workers used are charged to quota.
+  workers, chunk_size = run_settings(options)
+  if not should_parallelize(len(elements), workers): return None
+
+  try:
+    payload = pickle.dumps((func, captured), pickle.HIGHEST_PROTOCOL)
+  except Exception:
+    return None
+
+  # Imported here with the rest of the pool machinery (see get_executor).
+  from concurrent.futures import TimeoutError as FutureTimeout
+
+  chunks = split_chunks(elements, workers, chunk_size)
+  limits = chunk_limits(quota, len(chunks))
+  futures = []
+
+  try:
+    pool = get_executor()
+    futures = [pool.submit(worker, payload, limits, chunk) for chunk in chunks]
+    # Waiting stops at the run's deadline. Queued chunks are cancelled;
+    # running ones stop on their own, having been given the same deadline.
+    outcomes = [future.result(timeout=quota.remaining() if quota else None) for future in futures]
+  except FutureTimeout:
+    for future in futures:
+      future.cancel()
+    return None, quota.check()
+  except Exception as e:
+    for future in futures:
+      future.cancel()
+    return None, f'{type(e).__name__}: {e}'
+
+  values = []
+  details = None
+  for ok, result, (steps, size) in outcomes:
+    if quota: quota.charge(steps, size)
+    if not ok and details is None: details = result
+    if ok: values.extend(result)
+
+  message = quota.check() if quota else None
+  if message: return None, message
+  return values, details
+
+def parallel_map(func, captured, elements, quota=None, options=None):
+  return run_chunks(map_chunk, func, captured, elements, quota, options)
+
+def parallel_reduce(func, captured, elements, quota=None, options=None):
+  return run_chunks(reduce_chunk, func, captured, elements, quota, options)
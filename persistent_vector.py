@@ -0,0 +1,199 @@
+BITS = 5
+WIDTH = 1 << BITS
+MASK = WIDTH - 1
+
+class PersistentVector:
+  # 32-way trie with a detached tail (Clojure style). Nodes are plain lists
+  # that are never mutated once built, so any number of vectors can share
+  # them; the in-place methods (append, pop, extend) only rebind this
+  # vector's own root/tail.
+  __slots__ = ('count', 'shift', 'root', 'tail')
+
+  def __init__(self, elements=()):
+    elements = list(elements)
+    count = len(elements)
+    tail_offset = self.tail_offset_for(count)
+    level = [elements[i:i + WIDTH] for i in range(0, tail_offset, WIDTH)]
+    shift = BITS
+
+    while len(level) > WIDTH:
+      level = [level[i:i + WIDTH] for i in range(0, len(level), WIDTH)]
+      shift += BITS
+
+    self.set_state(count, shift, level, elements[tail_offset:])
+
+  @staticmethod
+  def tail_offset_for(count):
+    if count < WIDTH: return 0
+    return ((count - 1) >> BITS) << BITS
+
+  def set_state(self, count, shift, root, tail):
+    self.count = count
+    self.shift = shift
+    self.root = root
+    self.tail = tail
+    return self
+
+  def copy(self):
+    return PersistentVector.__new__(PersistentVector).set_state(self.count, self.shift, self.root, self.tail)
+
+  def normalize_index(self, index):
+    if not isinstance(index, int):
+      raise TypeError('vector indices must be integers')
+    if index < 0:
+      index += self.count
+    if index < 0 or index >= self.count:
+      raise IndexError('vector index out of range')
+    return index
+
+  def leaf_for(self, index):
+    if index >= self.tail_offset_for(self.count):
+      return self.tail
+
+    node = self.root
+    level = self.shift
+    while level > 0:
+      node = node[(index >> level) & MASK]
+      level -= BITS
+    return node
+
+  ###################################
+
+  def appended(self, value):
+    count, shift, root, tail = self.count, self.shift, self.root, self.tail
+
+    if count - self.tail_offset_for(count) < WIDTH:
+      return self.copy().set_state(count + 1, shift, root, tail + [value])
+
+    if (count >> BITS) > (1 << shift):
+      root = [root, self.new_path(shift, tail)]
+      shift += BITS
+    else:
+      root = self.push_tail(count, shift, root, tail)
+
+    return self.copy().set_state(count + 1, shift, root, [value])
+
+  def push_tail(self, count, level, parent, tail_node):
+    sub_index = ((count - 1) >> level) & MASK
+    new_parent = list(parent)
+
+    if level == BITS:
+      node_to_insert = tail_node
+    elif sub_index < len(parent):
+      node_to_insert = self.push_tail(count, level - BITS, parent[sub_index], tail_node)
+    else:
+      node_to_insert = self.new_path(level - BITS, tail_node)
+
+    if sub_index < len(new_parent):
+      new_parent[sub_index] = node_to_insert
+    else:
+      new_parent.append(node_to_insert)
+    return new_parent
+
+  def new_path(self, level, node):
+    while level > 0:
+      node = [node]
+      level -= BITS
+    return node
+
+  def popped(self):
+    count, shift, root, tail = self.count, self.shift, self.root, self.tail
+
+    if count == 0:
+      raise IndexError('pop from empty vector')
+    if count == 1:
+      return PersistentVector()
+    if count - self.tail_offset_for(count) > 1:
+      return self.copy().set_state(count - 1, shift, root, tail[:-1])
+
+    new_tail = self.leaf_for(count - 2)
+    new_root = self.pop_tail(count, shift, root)
+    if new_root is None:
+      new_root = []
+    if shift > BITS and len(new_root) == 1:
+      new_root = new_root[0]
+      shift -= BITS
+
+    return self.copy().set_state(count - 1, shift, new_root, new_tail)
+
+  def pop_tail(self, count, level, node):
+    sub_index = ((count - 2) >> level) & MASK
+
+    if level > BITS:
+      new_child = self.pop_tail(count, level - BITS, node[sub_index])
+      if new_child is None and sub_index == 0:
+        return None
+      new_node = node[:sub_index]
+      if new_child is not None:
+        new_node.append(new_child)
+      return new_node
+    elif sub_index == 0:
+      return None
+    return node[:sub_index]
+
+  def assoc(self, index, value):
+    index = self.normalize_index(index)
+
+    if index >= self.tail_offset_for(self.count):
+      new_tail = list(self.tail)
+      new_tail[index & MASK] = value
+      return self.copy().set_state(self.count, self.shift, self.root, new_tail)
+
+    return self.copy().set_state(self.count, self.shift, self.do_assoc(self.shift, self.root, index, value), self.tail)
+
+  def do_assoc(self, level, node, index, value):
+    new_node = list(node)
+    if level == 0:
+      new_node[index & MASK] = value
+    else:
+      sub_index = (index >> level) & MASK
+      new_node[sub_index] = self.do_assoc(level - BITS, node[sub_index], index, value)
+    return new_node
+
+  def removed(self, index):
+    index = self.normalize_index(index)
+
+    if index == self.count - 1:
+      return self.popped()
+
+    elements = list(self)
+    del elements[index]
+    return PersistentVector(elements)
+
+  def concatenated(self, other):
+    new_vector = self.copy()
+    new_vector.extend(other)
+    return new_vector
+
+  ###################################
+
+  def append(self, value):
+    new_vector = self.appended(value)
+    self.set_state(new_vector.count, new_vector.shift, new_vector.root, new_vector.tail)
+
+  def extend(self, values):
+    for value in list(values):
+      self.append(value)
+
+  def pop(self, index=-1):
+    index = self.normalize_index(index)
+    element = self[index]
+    new_vector = self.removed(index)
+    self.set_state(new_vector.count, new_vector.shift, new_vector.root, new_vector.tail)
+    return element
+
+  def __len__(self):
+    return self.count
+
+  def __getitem__(self, index):
+    index = self.normalize_index(index)
+    return self.leaf_for(index)[index & MASK]
+
+  def __iter__(self):
+    tail_offset = self.tail_offset_for(self.count)
+    for index in range(0, tail_offset, WIDTH):
+      yield from self.leaf_for(index)
+    yield from self.tail
+
+  def __repr__(self):
+    return f'PersistentVector({list(self)!r})'
@@ -0,0 +1,151 @@
+from hooks import Hook
+import time
+
+class Call:
+  __slots__ = ('context', 'outer', 'boundary', 'child', 'start')
+
+  def __init__(self, context, outer, boundary, start):
+    self.context = context
+    self.outer = outer
+    self.boundary = boundary
+    self.child = 0.0
+    self.start = start
+
+class Visit:
+  __slots__ = ('key', 'span', 'outer', 'child', 'start')
+
+  def __init__(self, key, span, outer, start):
+    self.key = key
+    self.span = span
+    self.outer = outer
+    self.child = 0.0
+    self.start = start
+
+class Profiler(Hook):
+  # Deterministic profile of ozen code, built on the run hooks. Every call
+  # and every node visit of a run is timed: functions are keyed by name,
+  # lines by (file, line) and call stacks by the chain of contexts that led
+  # to the call. Recursive entries only count towards total time once,
+  # like cProfile.
+  def __init__(self, clock=time.perf_counter):
+    self.clock = clock
+    self.functions = {}   # name -> [calls, self seconds, total seconds]
+    self.lines = {}       # (file, line) -> [hits, self seconds, total seconds]
+    self.stacks = {}      # 'outer;inner' -> self seconds
+    self.calls = []
+    self.visits = []
+    self.active_functions = {}
+    self.active_lines = {}
+
+  def run_start(self, context):
+    self.enter(context)
+
+  def run_end(self, context, result):
+    self.leave()
+
+  def function_call(self, function, args, context):
+    self.enter(context)
+
+  def function_return(self, function, result, context):
+    self.leave()
+
+  def enter(self, context):
+    # The key-less visit marks the call boundary, so the callee's first
+    # line counts as a fresh hit even when it shares a line with the call
+    # site.
+    name = context.display_name
+    outer = self.active_functions.get(name, 0)
+    self.active_functions[name] = outer + 1
+    boundary = Visit(None, False, 0, 0.0)
+    self.visits.append(boundary)
+    self.calls.append(Call(context, outer, boundary, self.clock()))
+
+  def leave(self):
+    now = self.clock()
+    call = self.calls.pop()
+    elapsed = now - call.start
+    name = call.context.display_name
+    self.active_functions[name] = call.outer
+    self.visits.pop()
+    if self.calls: self.calls[-1].child += elapsed
+    if self.visits: self.visits[-1].child += call.boundary.child
+
+    own = elapsed - call.child
+    stats = self.functions.get(name, None)
+    if stats is None:
+      stats = self.functions[name] = [0, 0.0, 0.0]
+    stats[0] += 1
+    stats[1] += own
+    if not call.outer: stats[2] += elapsed
+
+    stack = stack_key(call.context)
+    self.stacks[stack] = self.stacks.get(stack, 0.0) + own
+
+  def node_enter(self, node, context):
+    # A node that spans several lines (a block, a multi-line loop) only
+    # adds its own overhead to its first line, to self and total alike; the
+    # rest of its time belongs to the lines of its children.
+    key = (node.start.fn, node.start.line + 1)
+    span = node.end.line != node.start.line
+    outer = self.active_lines.get(key, 0)
+    if not span: self.active_lines[key] = outer + 1
+    self.visits.append(Visit(key, span, outer, self.clock()))
+
+  def node_exit(self, node, context, result):
+    now = self.clock()
+    visit = self.visits.pop()
+    elapsed = now - visit.start
+    key = visit.key
+    if not visit.span: self.active_lines[key] = visit.outer
+    parent = self.visits[-1] if self.visits else None
+    if parent: parent.child += elapsed
+
+    stats = self.lines.get(key, None)
+    if stats is None:
+      stats = self.lines[key] = [0, 0.0, 0.0]
+    own = elapsed - visit.child
+    if parent is None or parent.key != key: stats[0] += 1
+    stats[1] += own
+    if visit.span: stats[2] += own
+    elif not visit.outer: stats[2] += elapsed
+
+  ###################################
+
+  def collapsed(self):
+    # One 'outer;inner microseconds' line per stack, the input format of
+    # flamegraph.pl, inferno and speedscope.
+    lines = []
+    for stack, seconds in sorted(self.stacks.items()):
+      count = round(seconds * 1e6)
+      if count > 0:
+        lines.append(f'{stack} {count}\n')
+    return ''.join(lines)
+
+  def report(self, limit=20):
+    lines = ['Functions (by self time)\n', f'{"calls":>9} {"self ms":>10} {"total ms":>10}  name\n']
+    for name, (calls, own, total) in top(self.functions, limit):
+      lines.append(f'{calls:>9} {own * 1e3:>10.3f} {total * 1e3:>10.3f}  {name}\n')
+
+    lines += ['\nLines (by self time)\n', f'{"hits":>9} {"self ms":>10} {"total ms":>10}  line\n']
+    for (fn, line), (hits, own, total) in top(self.lines, limit):
+      lines.append(f'{hits:>9} {own * 1e3:>10.3f} {total * 1e3:>10.3f}  {fn}:{line}\n')
+    return ''.join(lines)
+
+  def write_collapsed(self, path):
+    with open(path, 'w', encoding='utf-8') as f:
+      f.write(self.collapsed())
+
+  def write_report(self, path, limit=20):
+    with open(path, 'w', encoding='utf-8') as f:
+      f.write(self.report(limit))
+
+def stack_key(context):
+  names = []
+  while context:
+    names.append(context.display_name.replace(';', ':'))
+    context = context.parent
+  return ';'.join(reversed(names))
+
+def top(stats, limit):
+  ordered = sorted(stats.items(), key=lambda item: item[1][1], reverse=True)
+  return ordered[:limit] if limit else ordered
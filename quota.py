@@ -0,0 +1,102 @@
+from datatype import Number, String, List
+from tokens import TKN_PLUS, TKN_MUL, TKN_POW
+import time
+
+POINTER_SIZE = 8
+
+class Limits:
+  # Ceilings for a single run; None switches that check off. Steps are
+  # loop iterations plus calls, bytes are the approximate total allocated
+  # by growing operations (string/list building, big integers, buffers).
+  def __init__(self, max_steps=None, max_seconds=None, max_depth=None, max_bytes=None):
+    self.max_steps = max_steps
+    self.max_seconds = max_seconds
+    self.max_depth = max_depth
+    self.max_bytes = max_bytes
+
+  def __repr__(self):
+    return (
+      f'Limits(max_steps={self.max_steps}, max_seconds={self.max_seconds}, '
+      f'max_depth={self.max_depth}, max_bytes={self.max_bytes})'
+    )
+
+class Quota:
+  # The running counters for one Limits. Every method returns an error
+  # message once a ceiling is crossed, or None.
+  __slots__ = ('limits', 'steps', 'bytes', 'deadline')
+
+  def __init__(self, limits):
+    self.limits = limits
+    self.steps = 0
+    self.bytes = 0
+    self.deadline = time.monotonic() + limits.max_seconds if limits.max_seconds is not None else None
+
+  def step(self):
+    self.steps += 1
+    if self.limits.max_steps is not None and self.steps > self.limits.max_steps:
+      return f'Step limit of {self.limits.max_steps} exceeded'
+    if self.deadline is not None and time.monotonic() > self.deadline:
+      return f'Time limit of {self.limits.max_seconds}s exceeded'
+    return None
+
+  def charge(self, steps, size):
+    # Work done on this run's behalf elsewhere (pmap workers).
+    self.steps += steps
+    self.bytes += size
+
+  def check(self):
+    if self.limits.max_steps is not None and self.steps > self.limits.max_steps:
+      return f'Step limit of {self.limits.max_steps} exceeded'
+    if self.limits.max_bytes is not None and self.bytes > self.limits.max_bytes:
+      return f'Memory limit of {self.limits.max_bytes} bytes exceeded'
+    if self.deadline is not None and time.monotonic() > self.deadline:
+      return f'Time limit of {self.limits.max_seconds}s exceeded'
+    return None
+
+  def enter(self, depth):
+    if self.limits.max_depth is not None and depth > self.limits.max_depth:
+      return f'Recursion depth limit of {self.limits.max_depth} exceeded'
+    return self.step()
+
+  def allocate(self, size):
+    if size <= 0: return None
+    self.bytes += size
+    if self.limits.max_bytes is not None and self.bytes > self.limits.max_bytes:
+      return f'Memory limit of {self.limits.max_bytes} bytes exceeded'
+    return None
+
+  def remaining(self):
+    if self.deadline is None: return None
+    return max(self.deadline - time.monotonic(), 0)
+
+  def bytes_left(self):
+    if self.limits.max_bytes is None: return None
+    return max(self.limits.max_bytes - self.bytes, 0)
+
+def int_size(value):
+  return (abs(value).bit_length() + 7) // 8
+
+def is_int(value):
+  return isinstance(value, Number) and isinstance(value.value, int)
+
+def estimate_size(op_type, left, right):
+  # Size of the value a binary operation is about to build, worked out
+  # from its operands so oversized results are refused before they exist.
+  if op_type == TKN_PLUS:
+    if isinstance(left, String) and isinstance(right, String):
+      # The rope shares both operands, so only the shorter side counts as
+      # new: building a string piece by piece is charged its final length.
+      return min(len(left.rope), len(right.rope))
+    if isinstance(left, List):
+      return POINTER_SIZE
+  elif op_type == TKN_MUL:
+    if isinstance(left, String) and is_int(right):
+      return len(left.rope) * right.value
+    if isinstance(left, List) and isinstance(right, List):
+      return (len(left.elements) + len(right.elements)) * POINTER_SIZE
+    if is_int(left) and is_int(right):
+      return int_size(left.value) + int_size(right.value)
+  elif op_type == TKN_POW:
+    if is_int(left) and is_int(right) and abs(left.value) > 1 and right.value > 0:
+      return right.value * int_size(left.value)
+  return 0
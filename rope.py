@@ -0,0 +1,76 @@
+SHORT_CONCAT = 64
+
+class Rope:
+  # Concatenation node. Flattening walks the tree iteratively and caches the
+  # joined text on the node, dropping the children so they can be collected.
+  __slots__ = ('left', 'right', 'length', 'flat')
+
+  def __init__(self, left, right):
+    self.left = left
+    self.right = right
+    self.length = len(left) + len(right)
+    self.flat = None
+
+  def flatten(self):
+    if self.flat is None:
+      pieces = []
+      stack = [self]
+
+      while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+          pieces.append(node)
+        elif isinstance(node, Rope) and node.flat is None:
+          # Another thread may be flattening this node: it publishes flat
+          # before dropping the children, so a missing child means flat is set.
+          left, right = node.left, node.right
+          if left is None or right is None:
+            pieces.append(node.flat)
+          else:
+            stack.append(right)
+            stack.append(left)
+        else:
+          pieces.append(node.flatten())
+
+      self.flat = ''.join(pieces)
+      self.left = self.right = None
+    return self.flat
+
+  def __len__(self):
+    return self.length
+
+class RepeatedRope:
+  __slots__ = ('base', 'times', 'length', 'flat')
+
+  def __init__(self, base, times):
+    self.base = base
+    self.times = times
+    self.length = len(base) * times
+    self.flat = None
+
+  def flatten(self):
+    base = self.base
+    if self.flat is None and base is not None:
+      base = base if isinstance(base, str) else base.flatten()
+      self.flat = base * self.times
+      self.base = None
+    return self.flat
+
+  def __len__(self):
+    return self.length
+
+def concat_ropes(left, right):
+  if len(left) == 0: return right
+  if len(right) == 0: return left
+
+  if isinstance(left, str) and isinstance(right, str) and len(left) + len(right) <= SHORT_CONCAT:
+    return left + right
+  return Rope(left, right)
+
+def repeat_rope(base, times):
+  if times <= 0 or len(base) == 0: return ''
+  if times == 1: return base
+
+  if isinstance(base, str) and len(base) * times <= SHORT_CONCAT:
+    return base * times
+  return RepeatedRope(base, times)
@@ -0,0 +1,186 @@
+from datatype import Value, Number, List
+from errors import RunTimeError
+import array
+import struct
+import threading
+
+HEADER = struct.Struct('<c7xq')
+TYPECODES = {'float': 'd', 'int': 'q'}
+ITEM_SIZE = 8
+INT_RANGE = (-2**63, 2**63 - 1)
+
+# Held while attach has the resource tracker's register switched off, so a
+# buffer created on another thread meanwhile is still registered.
+tracker_lock = threading.Lock()
+
+class SharedSegment:
+  # Owns the mapping and the typed view into it. Copies of a buffer value
+  # share one segment. The creating run's environment releases it when
+  # the run ends (or the last copy going away does, whichever is first);
+  # the creator also unlinks the name.
+  __slots__ = ('memory', 'window', 'data', 'owner')
+
+  def __init__(self, memory, typecode, length, owner):
+    self.memory = memory
+    self.owner = owner
+    self.window = memory.buf[HEADER.size:HEADER.size + length * ITEM_SIZE]
+    self.data = self.window.cast(typecode)
+
+  def release(self):
+    # Views first, innermost out: the mapping cannot close while any
+    # view into it is still exported.
+    if self.data is None: return
+    self.data.release()
+    self.window.release()
+    self.data = self.window = None
+    try:
+      self.memory.close()
+    except BufferError:
+      # A view still held elsewhere; SharedMemory closes the mapping when
+      # it is collected. Unlinking the name does not need it closed.
+      pass
+    if self.owner:
+      self.owner = False
+      self.memory.unlink()
+
+  def __del__(self):
+    self.release()
+
+class NumericBuffer(Value):
+  # A flat array of 64-bit numbers in a named shared memory segment. The
+  # header stores the element type and length so other processes can
+  # attach by name alone; pickling a buffer only sends that name.
+  def __init__(self, segment, typecode, length):
+    super().__init__()
+    self.segment = segment
+    self.typecode = typecode
+    self.length = length
+
+  @staticmethod
+  def create(length, typecode):
+    # Imported here: multiprocessing is slow to load and most runs never
+    # touch a buffer.
+    from multiprocessing import shared_memory
+
+    with tracker_lock:
+      memory = shared_memory.SharedMemory(create=True, size=max(HEADER.size + length * ITEM_SIZE, 1))
+    HEADER.pack_into(memory.buf, 0, typecode.encode(), length)
+    return NumericBuffer(SharedSegment(memory, typecode, length, True), typecode, length)
+
+  @staticmethod
+  def attach(name):
+    from multiprocessing import shared_memory, resource_tracker
+
+    try:
+      memory = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+      # Before 3.13 attaching always registers with the resource tracker,
+      # which workers share with the creator; keep the creator's entry.
+      with tracker_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+          memory = shared_memory.SharedMemory(name=name)
+        finally:
+          resource_tracker.register = register
+
+    typecode, length = HEADER.unpack_from(memory.buf, 0)
+    typecode = typecode.decode()
+    return NumericBuffer(SharedSegment(memory, typecode, length, False), typecode, length)
+
+  @property
+  def data(self):
+    if self.segment.data is None:
+      raise ValueError('buffer has been released')
+    return self.segment.data
+
+  @property
+  def released(self):
+    return self.segment.data is None
+
+  @property
+  def name(self):
+    return self.segment.memory.name
+
+  @property
+  def kind(self):
+    return 'int' if self.typecode == 'q' else 'float'
+
+  def convert(self, value):
+    # Raises OverflowError (or ValueError for NaN) when value does not fit
+    # the element type.
+    if self.typecode == 'd': return float(value)
+    value = int(value)
+    if not INT_RANGE[0] <= value <= INT_RANGE[1]:
+      raise OverflowError(f'{value} does not fit a 64-bit integer')
+    return value
+
+  def index_error(self, other):
+    return RunTimeError(
+      other.start, other.end,
+      'Index element is out of bounds',
+      self.context
+    )
+
+  def value_error(self, other):
+    return RunTimeError(
+      other.start, other.end,
+      f'Value does not fit the buffer type ({self.kind})',
+      self.context
+    )
+
+  def get(self, index):
+    if not isinstance(index, Number) or not isinstance(index.value, int):
+      return None, Value.illegal_operation(self, index)
+
+    try:
+      return Number(self.data[index.value]).set_context(self.context), None
+    except (IndexError, ValueError):
+      return None, self.index_error(index)
+
+  def set(self, index, value):
+    if not isinstance(index, Number) or not isinstance(index.value, int) or not isinstance(value, Number):
+      return None, Value.illegal_operation(self, index)
+
+    try:
+      converted = self.convert(value.value)
+    except (OverflowError, TypeError, ValueError):
+      return None, self.value_error(value)
+
+    try:
+      self.data[index.value] = converted
+      return value, None
+    except (IndexError, ValueError):
+      return None, self.index_error(index)
+
+  def read(self, start, end):
+    return [Number(x) for x in self.data[start:end].tolist()]
+
+  def write(self, start, values):
+    # Raises IndexError for a slice outside the buffer and OverflowError
+    # (or ValueError) for a value that does not fit it.
+    converted = array.array(self.typecode, [self.convert(value.value) for value in values])
+    if start < 0 or start + len(converted) > self.length:
+      raise IndexError('buffer slice out of range')
+    self.data[start:start + len(converted)] = converted
+
+  def release(self):
+    self.segment.release()
+
+  def divide(self, other):
+    return self.get(other)
+
+  def is_true(self):
+    return self.length > 0
+
+  def copy(self):
+    copy = NumericBuffer(self.segment, self.typecode, self.length)
+    copy.set_position(self.start, self.end)
+    copy.set_context(self.context)
+    return copy
+
+  def __reduce__(self):
+    return (NumericBuffer.attach, (self.name,))
+
+  def __repr__(self):
+    return f'<buffer {self.name} {self.kind}[{self.length}]>'
@@ -41,6 +41,9 @@ class Parser:
   def __init__(self, tkns):
     self.tkns = tkns
     self.tkn_index = -1
+    # One flag per function body being parsed; a yield marks the innermost
+    # one as a generator.
+    self.generator_flags = []
     self.next()
 
   def next(self):
@@ -119,6 +122,22 @@ class Parser:
         self.reverse(result.to_reverse_count)
       return result.success(ReturnNode(expr, start, self.current_tkn.start.copy()))
     
+    if self.current_tkn.matches(TKN_KEYWORD, 'yield'):
+      if not self.generator_flags:
+        return result.failure(InvalidSyntaxError(
+          self.current_tkn.start, self.current_tkn.end,
+          "'yield' outside of a function"
+        ))
+      self.generator_flags[-1] = True
+
+      result.register_next()
+      self.next()
+
+      expr = result.try_register(self.expr())
+      if not expr:
+        self.reverse(result.to_reverse_count)
+      return result.success(YieldNode(expr, start, self.current_tkn.start.copy()))
+
     if self.current_tkn.matches(TKN_KEYWORD, 'continue'):
       result.register_next()
       self.next()
@@ -133,7 +152,7 @@ class Parser:
     if result.error:
       return result.failure(InvalidSyntaxError(
         self.current_tkn.start, self.current_tkn.end,
-        "Expected 'return', 'continue', 'break', 'let', 'if', 'for', 'while', 'FUN', int, float, identifier, '+', '-', '(', '[' or 'not'"
+        "Expected 'return', 'yield', 'continue', 'break', 'let', 'if', 'for', 'while', 'FUN', int, float, identifier, '+', '-', '(', '[' or 'not'"
       ))
     return result.success(expr)
 
@@ -223,42 +242,63 @@ class Parser:
 
   def call(self):
     result = ParseResult()
-    atom = result.register(self.atom())
+    node = result.register(self.atom())
     if result.error: return result
 
-    if self.current_tkn.type == TKN_LPAREN:
+    while self.current_tkn.type in (TKN_LPAREN, TKN_DOT):
+      if self.current_tkn.type == TKN_LPAREN:
+        node = result.register(self.call_args(node))
+        if result.error: return result
+        continue
+
       result.register_next()
       self.next()
-      arg_nodes = []
 
-      if self.current_tkn.type == TKN_RPAREN:
-        result.register_next()
-        self.next()
-      else:
-        arg_nodes.append(result.register(self.expr()))
-        if result.error:
-          return result.failure(InvalidSyntaxError(
-            self.current_tkn.start, self.current_tkn.end,
-            "Expected ')', 'INT', 'FLOAT', 'STRING', 'if', 'for', 'while', 'FUN', int, float, identifier, '+', '-', '(', '[' or 'not'"
-          ))
+      if self.current_tkn.type != TKN_IDENTIFIER:
+        return result.failure(InvalidSyntaxError(
+          self.current_tkn.start, self.current_tkn.end,
+          f"Expected field name"
+        ))
 
-        while self.current_tkn.type == TKN_COMMA:
-          result.register_next()
-          self.next()
+      node = FieldAccessNode(node, self.current_tkn)
+      result.register_next()
+      self.next()
 
-          arg_nodes.append(result.register(self.expr()))
-          if result.error: return result
+    return result.success(node)
 
-        if self.current_tkn.type != TKN_RPAREN:
-          return result.failure(InvalidSyntaxError(
-            self.current_tkn.start, self.current_tkn.end,
-            f"Expected ',' or ')'"
-          ))
+  def call_args(self, node_to_call):
+    result = ParseResult()
+    result.register_next()
+    self.next()
+    arg_nodes = []
+
+    if self.current_tkn.type == TKN_RPAREN:
+      result.register_next()
+      self.next()
+    else:
+      arg_nodes.append(result.register(self.expr()))
+      if result.error:
+        return result.failure(InvalidSyntaxError(
+          self.current_tkn.start, self.current_tkn.end,
+          "Expected ')', 'INT', 'FLOAT', 'STRING', 'if', 'for', 'while', 'FUN', int, float, identifier, '+', '-', '(', '[' or 'not'"
+        ))
 
+      while self.current_tkn.type == TKN_COMMA:
         result.register_next()
         self.next()
-      return result.success(CallNode(atom, arg_nodes))
-    return result.success(atom)
+
+        arg_nodes.append(result.register(self.expr()))
+        if result.error: return result
+
+      if self.current_tkn.type != TKN_RPAREN:
+        return result.failure(InvalidSyntaxError(
+          self.current_tkn.start, self.current_tkn.end,
+          f"Expected ',' or ')'"
+        ))
+
+      result.register_next()
+      self.next()
+    return result.success(CallNode(node_to_call, arg_nodes))
 
   def atom(self):
     result = ParseResult()
@@ -298,6 +338,11 @@ class Parser:
       list_expr = result.register(self.list_expr())
       if result.error: return result
       return result.success(list_expr)
+
+    elif tkn.type == TKN_LBRACE:
+      map_expr = result.register(self.map_expr())
+      if result.error: return result
+      return result.success(map_expr)
     
     elif tkn.matches(TKN_KEYWORD, 'if'):
       if_expr = result.register(self.if_expr())
@@ -319,9 +364,14 @@ class Parser:
       if result.error: return result
       return result.success(func_def)
 
+    elif tkn.matches(TKN_KEYWORD, 'record'):
+      record_def = result.register(self.record_def())
+      if result.error: return result
+      return result.success(record_def)
+
     return result.failure(InvalidSyntaxError(
       tkn.start, tkn.end,
-      "Expected 'let', int, float, identifier, '+', '-', '(', '[', if', 'for', 'while', 'func'"
+      "Expected 'let', int, float, identifier, '+', '-', '(', '[', '{', if', 'for', 'while', 'func'"
     ))
 
   def list_expr(self):
@@ -371,6 +421,64 @@ class Parser:
       self.current_tkn.end.copy()
     ))
 
+  def map_expr(self):
+    result = ParseResult()
+    pair_nodes = []
+    start = self.current_tkn.start.copy()
+
+    if self.current_tkn.type != TKN_LBRACE:
+      return result.failure(InvalidSyntaxError(
+        self.current_tkn.start, self.current_tkn.end,
+        f"Expected '{{'"
+      ))
+
+    result.register_next()
+    self.next()
+
+    if self.current_tkn.type == TKN_RBRACE:
+      result.register_next()
+      self.next()
+    else:
+      while True:
+        key = result.register(self.expr())
+        if result.error:
+          return result.failure(InvalidSyntaxError(
+            self.current_tkn.start, self.current_tkn.end,
+            "Expected '}', 'if', 'for', 'while', 'func', int, float, identifier, '+', '-', '(', '[', '{' or 'not'"
+          ))
+
+        if self.current_tkn.type != TKN_COLON:
+          return result.failure(InvalidSyntaxError(
+            self.current_tkn.start, self.current_tkn.end,
+            f"Expected ':'"
+          ))
+
+        result.register_next()
+        self.next()
+
+        value = result.register(self.expr())
+        if result.error: return result
+        pair_nodes.append((key, value))
+
+        if self.current_tkn.type != TKN_COMMA: break
+        result.register_next()
+        self.next()
+
+      if self.current_tkn.type != TKN_RBRACE:
+        return result.failure(InvalidSyntaxError(
+          self.current_tkn.start, self.current_tkn.end,
+          f"Expected ',' or '}}'"
+        ))
+
+      result.register_next()
+      self.next()
+
+    return result.success(MapNode(
+      pair_nodes,
+      start,
+      self.current_tkn.end.copy()
+    ))
+
   def if_expr(self):
     result = ParseResult()
     all_cases = result.register(self.if_expr_cases('if'))
@@ -502,38 +610,47 @@ class Parser:
     result.register_next()
     self.next()
 
-    if self.current_tkn.type != TKN_EQ:
-      return result.failure(InvalidSyntaxError(
-        self.current_tkn.start, self.current_tkn.end,
-        f"Expected '='"
-      ))
-    
-    result.register_next()
-    self.next()
+    if self.current_tkn.matches(TKN_KEYWORD, 'in'):
+      result.register_next()
+      self.next()
 
-    start_value = result.register(self.expr())
-    if result.error: return result
+      iterable = result.register(self.expr())
+      if result.error: return result
+    else:
+      iterable = None
 
-    if not self.current_tkn.matches(TKN_KEYWORD, 'to'):
-      return result.failure(InvalidSyntaxError(
-        self.current_tkn.start, self.current_tkn.end,
-        f"Expected 'to'"
-      ))
+      if self.current_tkn.type != TKN_EQ:
+        return result.failure(InvalidSyntaxError(
+          self.current_tkn.start, self.current_tkn.end,
+          f"Expected '=' or 'in'"
+        ))
     
-    result.register_next()
-    self.next()
+      result.register_next()
+      self.next()
 
-    end_value = result.register(self.expr())
-    if result.error: return result
+      start_value = result.register(self.expr())
+      if result.error: return result
 
-    if self.current_tkn.matches(TKN_KEYWORD, 'change'):
+      if not self.current_tkn.matches(TKN_KEYWORD, 'to'):
+        return result.failure(InvalidSyntaxError(
+          self.current_tkn.start, self.current_tkn.end,
+          f"Expected 'to'"
+        ))
+    
       result.register_next()
       self.next()
 
-      step_value = result.register(self.expr())
+      end_value = result.register(self.expr())
       if result.error: return result
-    else:
-      step_value = None
+
+      if self.current_tkn.matches(TKN_KEYWORD, 'change'):
+        result.register_next()
+        self.next()
+
+        step_value = result.register(self.expr())
+        if result.error: return result
+      else:
+        step_value = None
 
     if not self.current_tkn.matches(TKN_KEYWORD, 'do'):
       return result.failure(InvalidSyntaxError(
@@ -560,11 +677,13 @@ class Parser:
       result.register_next()
       self.next()
 
+      if iterable: return result.success(ForInNode(var_name, iterable, body, True))
       return result.success(ForNode(var_name, start_value, end_value, step_value, body, True))
     
     body = result.register(self.statement())
     if result.error: return result
 
+    if iterable: return result.success(ForInNode(var_name, iterable, body, False))
     return result.success(ForNode(var_name, start_value, end_value, step_value, body, False))
 
   def while_expr(self):
@@ -685,14 +804,17 @@ class Parser:
       result.register_next()
       self.next()
 
+      self.generator_flags.append(False)
       body = result.register(self.expr())
+      is_generator = self.generator_flags.pop()
       if result.error: return result
 
       return result.success(FuncDefNode(
         var_name_tkn,
         arg_name_tkns,
         body,
-        True
+        True,
+        is_generator
       ))
     
     if self.current_tkn.type != TKN_NEWLINE:
@@ -704,7 +826,9 @@ class Parser:
     result.register_next()
     self.next()
 
+    self.generator_flags.append(False)
     body = result.register(self.statements())
+    is_generator = self.generator_flags.pop()
     if result.error: return result
 
     if not self.current_tkn.matches(TKN_KEYWORD, 'end'):
@@ -720,9 +844,70 @@ class Parser:
       var_name_tkn,
       arg_name_tkns,
       body,
-      False
+      False,
+      is_generator
     ))
 
+  def record_def(self):
+    result = ParseResult()
+    start = self.current_tkn.start.copy()
+
+    if not self.current_tkn.matches(TKN_KEYWORD, 'record'):
+      return result.failure(InvalidSyntaxError(
+        self.current_tkn.start, self.current_tkn.end,
+        f"Expected 'record'"
+      ))
+
+    result.register_next()
+    self.next()
+
+    if self.current_tkn.type != TKN_IDENTIFIER:
+      return result.failure(InvalidSyntaxError(
+        self.current_tkn.start, self.current_tkn.end,
+        f"Expected identifier"
+      ))
+
+    var_name_tkn = self.current_tkn
+    result.register_next()
+    self.next()
+
+    if self.current_tkn.type != TKN_LPAREN:
+      return result.failure(InvalidSyntaxError(
+        self.current_tkn.start, self.current_tkn.end,
+        f"Expected '('"
+      ))
+
+    result.register_next()
+    self.next()
+    field_name_tkns = []
+
+    while self.current_tkn.type == TKN_IDENTIFIER:
+      if self.current_tkn.value in [tkn.value for tkn in field_name_tkns]:
+        return result.failure(InvalidSyntaxError(
+          self.current_tkn.start, self.current_tkn.end,
+          f"Duplicate field '{self.current_tkn.value}'"
+        ))
+
+      field_name_tkns.append(self.current_tkn)
+      result.register_next()
+      self.next()
+
+      if self.current_tkn.type != TKN_COMMA: break
+      result.register_next()
+      self.next()
+
+    if self.current_tkn.type != TKN_RPAREN:
+      return result.failure(InvalidSyntaxError(
+        self.current_tkn.start, self.current_tkn.end,
+        f"Expected identifier or ')'"
+      ))
+
+    end = self.current_tkn.end.copy()
+    result.register_next()
+    self.next()
+
+    return result.success(RecordDefNode(var_name_tkn, field_name_tkns, start, end))
+
   ###################################
 
   def bin_op(self, func_a, ops, func_b=None):
@@ -1,7 +1,5 @@
-import string
-
 DIGITS = '0123456789'
-LETTERS = string.ascii_letters
+LETTERS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
 LETTERS_DIGITS = LETTERS + DIGITS
 
 TKN_INT = 'INT'
@@ -20,6 +18,10 @@ TKN_LPAREN = 'LPAREN'
 TKN_RPAREN = 'RPAREN'
 TKN_LSQUARE = 'LSQUARE'
 TKN_RSQUARE = 'RSQUARE'
+TKN_LBRACE = 'LBRACE'
+TKN_RBRACE = 'RBRACE'
+TKN_COLON = 'COLON'
+TKN_DOT = 'DOT'
 TKN_EE = 'EE'
 TKN_NE = 'NE'
 TKN_LT = 'LT'
@@ -33,7 +35,7 @@ TKN_EOF = 'EOF'
 
 KEYWORDS = [ 'let', 'and', 'or', 'not', 'if', 'consider', 'last', 'for', 
 'to', 'change', 'while', 'func', 'do', 'end', 
-'return', 'continue', 'break' ]
+'return', 'continue', 'break', 'record', 'in', 'yield' ]
 
 class Token:
   def __init__(self, typ, value=None, start=None, end=None):